@@ -0,0 +1,122 @@
+"""
+📊 Landing sahifa ko'rishlari (QR skanerlar) — write-behind hisoblagich
+Har bir so'rov faqat xotiradagi lug'atda sonni oshiradi; fon vazifasi
+ANALYTICS_FLUSH_SECONDS da bir marta hammasini bitta tranzaksiyada yozadi.
+Skan to'lqinida ham bazaga yozish soni = har intervalda bitta.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from collections import Counter
+
+from database import add_page_views
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_FLUSH_SECONDS = float(os.getenv("ANALYTICS_FLUSH_SECONDS", "10"))
+
+# (page_id, soat, manba, qurilma) → ko'rishlar
+ViewKey = tuple[str, str, str, str]
+
+# Qidiruv tizimlari — mamlakat domenlari bilan (google.co.uk, yandex.ru)
+SEARCH_ENGINES = ("google", "yandex", "bing", "duckduckgo")
+# Domen o'zi yoki uning subdomeni (m.facebook.com), lekin box.com / linux.com emas
+SOCIAL_DOMAINS = (
+    "instagram.com", "facebook.com", "fb.com", "twitter.com", "x.com", "t.co",
+    "vk.com", "tiktok.com", "youtube.com", "youtu.be",
+)
+TELEGRAM_DOMAINS = ("t.me", "telegram.me", "web.telegram.org")
+BOT_MARKERS = ("bot", "crawl", "spider", "preview", "facebookexternalhit", "whatsapp", "curl", "python-")
+
+
+def hour_bucket(ts: float | None = None) -> str:
+    """UTC soat: '2025-01-31 14:00'"""
+    return time.strftime("%Y-%m-%d %H:00", time.gmtime(ts))
+
+
+def _in_domains(host: str, domains: tuple[str, ...]) -> bool:
+    return any(host == domain or host.endswith("." + domain) for domain in domains)
+
+
+def _is_search(host: str) -> bool:
+    """google.com, www.google.co.uk, yandex.ru — nomdan keyin faqat TLD qismlari"""
+    labels = host.split(".")
+    for i, label in enumerate(labels[:-1]):
+        if label in SEARCH_ENGINES:
+            return all(len(part) <= 3 for part in labels[i + 1:])
+    return False
+
+
+def referrer_class(referrer: str | None) -> str:
+    """Qayerdan kelgan: direct (QR skan odatda shu), telegram, search, social, other"""
+    if not referrer:
+        return "direct"
+    host = referrer.split("://", 1)[-1].split("/", 1)[0].rsplit("@", 1)[-1].split(":", 1)[0].lower()
+    if _in_domains(host, TELEGRAM_DOMAINS):
+        return "telegram"
+    if _is_search(host):
+        return "search"
+    if _in_domains(host, SOCIAL_DOMAINS):
+        return "social"
+    return "other"
+
+
+def device_class(user_agent: str | None) -> str:
+    """bot (link preview, crawler), mobile yoki desktop"""
+    ua = (user_agent or "").lower()
+    if not ua or any(marker in ua for marker in BOT_MARKERS):
+        return "bot"
+    if "mobi" in ua or "android" in ua or "iphone" in ua or "ipad" in ua:
+        return "mobile"
+    return "desktop"
+
+
+class ViewBuffer:
+    """Ko'rishlarni xotirada yig'ib, davriy ravishda bazaga yozish"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._counts: Counter[ViewKey] = Counter()
+        self._task: asyncio.Task | None = None
+
+    def record(self, page_id: str, referrer: str | None, user_agent: str | None):
+        """Bitta ko'rish (so'rov yo'lida — faqat xotira)"""
+        self._counts[(page_id, hour_bucket(), referrer_class(referrer), device_class(user_agent))] += 1
+
+    @property
+    def pending(self) -> int:
+        return sum(self._counts.values())
+
+    async def flush(self):
+        """Yig'ilganlarni bitta tranzaksiyada yozish"""
+        if not self._counts:
+            return
+        counts, self._counts = self._counts, Counter()
+        try:
+            await add_page_views([(*key, views) for key, views in counts.items()])
+        except Exception as e:
+            # Yo'qolmasin — keyingi flush'da qayta urinamiz
+            self._counts.update(counts)
+            logger.error(f"❌ Ko'rishlar yozilmadi ({len(counts)} qator): {e}")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="analytics-flush")
+
+    async def stop(self):
+        """Taymerni to'xtatib, qolganini yozish"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+
+views = ViewBuffer(ANALYTICS_FLUSH_SECONDS)
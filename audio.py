@@ -0,0 +1,168 @@
+"""
+🎧 Landing sahifa audiolari uchun oflayn ishlov
+- ixcham, striming uchun qulay AAC (.m4a, faststart) nusxa
+- oldindan hisoblangan waveform (peaks) — kichik JSON sidecar
+ffmpeg ixtiyoriy: topilmasa audio asl holida beriladi.
+ffmpeg alohida jarayon sifatida async ishga tushiriladi — QR worker pool'ni
+band qilmaydi (uzun audio QR chizishlarni WORKER_TIMEOUT gacha kutdirmasin).
+"""
+
+import os
+import json
+import shutil
+import asyncio
+import logging
+import tempfile
+import subprocess
+
+import numpy as np
+
+from database import update_page
+from media import MEDIA_DIR, variant_filename
+from workers import spawn
+
+logger = logging.getLogger(__name__)
+
+FFMPEG = os.getenv("FFMPEG_PATH") or shutil.which("ffmpeg")
+AUDIO_BITRATE = os.getenv("AUDIO_BITRATE", "64k")
+PEAKS_COUNT = 120
+PEAKS_SAMPLE_RATE = 8000
+# ffmpeg uzun audiolarda bir necha o'n soniya ishlashi mumkin
+AUDIO_TIMEOUT = 180
+# Bir jarayonda bir vaqtda ishlaydigan ffmpeg'lar (CPU band bo'lib qolmasin)
+AUDIO_CONCURRENCY = 2
+
+_ffmpeg_slots = asyncio.Semaphore(AUDIO_CONCURRENCY)
+
+
+def detect_ffmpeg() -> bool:
+    """Ishga tushishda ffmpeg borligini tekshirish va log qilish"""
+    if FFMPEG:
+        logger.info(f"🎧 ffmpeg topildi: {FFMPEG}")
+        return True
+    logger.warning("⚠️ ffmpeg topilmadi — audio transkod va waveform o'chirilgan")
+    return False
+
+
+async def _run(args: list[str]) -> bytes:
+    """ffmpeg'ni ishga tushirish; natija — stdout. Vaqt tugasa yoki bekor qilinsa — kill"""
+    cmd = [FFMPEG, "-hide_banner", "-loglevel", "error", "-nostdin", *args]
+    async with _ffmpeg_slots:
+        proc = await asyncio.create_subprocess_exec(
+            *cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), AUDIO_TIMEOUT)
+        except BaseException:
+            if proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+            raise
+    if proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, stdout, stderr)
+    return stdout
+
+
+def compute_peaks(samples: np.ndarray, count: int = PEAKS_COUNT) -> list[float]:
+    """PCM namunalardan count ta normallashtirilgan cho'qqi (0..1)"""
+    if samples.size == 0:
+        return [0.0] * count
+    amplitude = np.abs(samples.astype(np.float32))
+    buckets = np.array_split(amplitude, count)
+    peaks = np.array([b.max() if b.size else 0.0 for b in buckets])
+    top = peaks.max()
+    if top > 0:
+        peaks = peaks / top
+    return [round(float(p), 3) for p in peaks]
+
+
+async def _transcode(source: str) -> str:
+    stream = variant_filename(source, "stream", "m4a")
+    fd, tmp = tempfile.mkstemp(dir=MEDIA_DIR, prefix=".", suffix=".part.m4a")
+    os.close(fd)
+    try:
+        # moov atomi boshida — brauzer faylni to'liq yuklamasdan o'ynay boshlaydi
+        await _run([
+            "-y", "-i", str(MEDIA_DIR / source), "-vn", "-ac", "1",
+            "-c:a", "aac", "-b:a", AUDIO_BITRATE, "-movflags", "+faststart", tmp,
+        ])
+        os.replace(tmp, MEDIA_DIR / stream)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return stream
+
+
+def _save_peaks(source: str, pcm: bytes) -> str:
+    """PCM'dan waveform sidecar yozish (thread'da)"""
+    samples = np.frombuffer(pcm, dtype=np.int16)
+    sidecar = {
+        "duration": round(samples.size / PEAKS_SAMPLE_RATE, 2),
+        "peaks": compute_peaks(samples),
+    }
+    filename = variant_filename(source, "peaks", "json")
+    fd, tmp = tempfile.mkstemp(dir=MEDIA_DIR, prefix=".", suffix=".part.json")
+    with os.fdopen(fd, "w") as f:
+        json.dump(sidecar, f, separators=(",", ":"))
+    os.replace(tmp, MEDIA_DIR / filename)
+    return filename
+
+
+async def _write_peaks(source: str) -> str:
+    pcm = await _run([
+        "-i", str(MEDIA_DIR / source), "-vn", "-ac", "1",
+        "-ar", str(PEAKS_SAMPLE_RATE), "-f", "s16le", "-",
+    ])
+    return await asyncio.to_thread(_save_peaks, source, pcm)
+
+
+async def build_audio_assets(source: str) -> dict:
+    """AAC nusxa va waveform sidecar yasash"""
+    return {"audio_stream": await _transcode(source), "audio_peaks": await _write_peaks(source)}
+
+
+def load_peaks(filename: str | None) -> dict | None:
+    """Sidecar'ni o'qish (landing render uchun, thread'da chaqiriladi)"""
+    if not filename:
+        return None
+    try:
+        with open(MEDIA_DIR / filename) as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"⚠️ Waveform o'qilmadi ({filename}): {e}")
+        return None
+
+
+def existing_audio_assets(source: str) -> dict | None:
+    """Shu audio (bir xil kontent) boshqa sahifa uchun allaqachon ishlangan bo'lsa (thread'da)"""
+    result = {
+        "audio_stream": variant_filename(source, "stream", "m4a"),
+        "audio_peaks": variant_filename(source, "peaks", "json"),
+    }
+    if all((MEDIA_DIR / filename).exists() for filename in result.values()):
+        return result
+    return None
+
+
+async def _process_audio(page_id: str, source: str):
+    result = await asyncio.to_thread(existing_audio_assets, source)
+    if result is None:
+        try:
+            result = await build_audio_assets(source)
+        except Exception as e:
+            logger.error(f"❌ Audio ishlovi xato ({source}): {e}")
+            return
+
+    # Compare-and-set: kesh (PAGE_ROW_TTL) boshqa jarayon yozuvini ko'rmasligi mumkin
+    page = await update_page(page_id, result, expected={"audio": source})
+    if not page:
+        # Bu orada audio almashtirilgan yoki o'chirilgan — fayllar blob'ga tegishli,
+        # kerak bo'lmasa media GC o'chiradi
+        return
+    logger.info(f"🎧 Audio tayyor: {page_id} ({result['audio_stream']})")
+
+
+def schedule_audio_processing(page_id: str, source: str):
+    """Audio ishlovini fonda boshlash (ffmpeg bo'lmasa — hech narsa qilmaydi)"""
+    if FFMPEG:
+        spawn(_process_audio(page_id, source))
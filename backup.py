@@ -0,0 +1,150 @@
+"""
+💾 Bazaning zaxira nusxasi — jonli bazadan izchil snapshot
+SQLite online backup API sahifalab (BACKUP_STEP_PAGES) nusxa oladi: har bir
+qadam orasida manba qulflanmaydi, shuning uchun bot va landing sahifalar
+kutmaydi. Hammasi alohida thread'da; natija gzip bilan oqim holida siqiladi
+va BACKUP_DIR da oxirgi BACKUP_KEEP tasi saqlanadi.
+"""
+
+import os
+import gzip
+import time
+import shutil
+import sqlite3
+import asyncio
+import logging
+from pathlib import Path
+
+from database import BASE_DIR, DB_PATH
+from metrics import histogram, timed
+
+logger = logging.getLogger(__name__)
+
+BACKUP_DIR = BASE_DIR / os.getenv("BACKUP_DIR", "backups")
+BACKUP_KEEP = int(os.getenv("BACKUP_KEEP", "7"))
+# Bitta qadamda nusxalanadigan sahifalar (4 KB dan) va qadamlar orasidagi pauza
+BACKUP_STEP_PAGES = int(os.getenv("BACKUP_STEP_PAGES", "1024"))
+BACKUP_STEP_SLEEP = float(os.getenv("BACKUP_STEP_SLEEP", "0.005"))
+# Yozuvlar nusxani shuncha marta boshidan boshlatsa — bitta qadamda olinadi
+BACKUP_MAX_RESTARTS = int(os.getenv("BACKUP_MAX_RESTARTS", "3"))
+
+backup_seconds = histogram("backup_seconds", "Zaxira nusxa (snapshot + siqish)", buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 300))
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def _signature(path: Path) -> tuple:
+    """Baza va WAL fayllari holati — o'zgarmagan bo'lsa yangi nusxa kerak emas"""
+    parts = []
+    for file in (path, path.with_name(path.name + "-wal")):
+        try:
+            stat = file.stat()
+            parts.append((stat.st_size, stat.st_mtime_ns))
+        except FileNotFoundError:
+            parts.append(None)
+    return tuple(parts)
+
+
+def snapshot(source: Path, dest: Path) -> int:
+    """
+    source → dest izchil nusxa (online backup API, sahifalab).
+    Natija — qayta boshlanishlar soni.
+    """
+    restarts = 0
+    last_remaining = None
+
+    def progress(status, remaining, total):
+        nonlocal restarts, last_remaining
+        # Boshqa ulanish yozsa, SQLite nusxani boshidan boshlaydi (remaining kamaymaydi)
+        if last_remaining is not None and remaining >= last_remaining:
+            restarts += 1
+            if restarts > BACKUP_MAX_RESTARTS:
+                raise _TooManyRestarts
+        last_remaining = remaining
+        # Qadamlar orasida manba bo'sh — yozuvchilar shu paytda ishlaydi
+        time.sleep(BACKUP_STEP_SLEEP)
+
+    src = sqlite3.connect(source, timeout=30)
+    try:
+        dst = sqlite3.connect(dest)
+        try:
+            try:
+                src.backup(dst, pages=BACKUP_STEP_PAGES, progress=progress)
+            except _TooManyRestarts:
+                # Yozuv oqimi tinmayapti — bitta qadamda (WAL'da yozuvchilarni to'xtatmaydi)
+                logger.warning(f"⚠️ Backup {restarts} marta qayta boshlandi — bitta qadamda olinadi")
+                src.backup(dst, pages=-1)
+            # Bitta mustaqil fayl bo'lsin (-wal/-shm'siz ochilsin)
+            dst.execute("PRAGMA journal_mode = DELETE")
+        finally:
+            dst.close()
+    finally:
+        src.close()
+    return restarts
+
+
+def compress(source: Path, dest: Path):
+    """Oqim holida gzip (butun fayl xotiraga olinmaydi)"""
+    with open(source, "rb") as f, gzip.open(dest, "wb", compresslevel=6) as out:
+        shutil.copyfileobj(f, out, 1024 * 1024)
+
+
+def rotate(directory: Path, keep: int):
+    """Eng yangi keep tadan boshqasini o'chirish"""
+    backups = sorted(directory.glob("*.db.gz"))
+    for old in backups[:-keep] if keep > 0 else []:
+        old.unlink(missing_ok=True)
+
+
+class BackupManager:
+    """Nusxalarni yaratish (bir vaqtda bittadan) va o'zgarmagan bazani qayta nusxalamaslik"""
+
+    def __init__(self, directory: Path, keep: int):
+        self.directory = directory
+        self.keep = keep
+        self.latest: Path | None = None
+        self._signature: tuple | None = None
+        self._lock = asyncio.Lock()
+
+    def _create(self, source: Path) -> Path:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        name = f"{source.stem}-{time.strftime('%Y%m%d-%H%M%S')}"
+        raw = self.directory / f"{name}.db.part"
+        final = self.directory / f"{name}.db.gz"
+        part = self.directory / f"{name}.db.gz.part"
+        try:
+            with timed(backup_seconds):
+                restarts = snapshot(source, raw)
+                compress(raw, part)
+            part.replace(final)
+        finally:
+            raw.unlink(missing_ok=True)
+            part.unlink(missing_ok=True)
+        rotate(self.directory, self.keep)
+        logger.info(
+            f"💾 Backup tayyor: {final.name} ({final.stat().st_size / 1024:.0f} KB"
+            f"{f', {restarts} qayta boshlanish' if restarts else ''})"
+        )
+        return final
+
+    async def create(self, source: Path | None = None) -> Path | None:
+        """
+        Yangi nusxa (thread'da); baza oxirgi nusxadan beri o'zgarmagan bo'lsa — o'sha.
+        Baza fayli bo'lmasa — None.
+        """
+        source = source or DB_PATH
+        async with self._lock:
+            if not source.exists():
+                return None
+            signature = _signature(source)
+            if signature == self._signature and self.latest and self.latest.exists():
+                logger.info(f"💾 Baza o'zgarmagan — oxirgi nusxa: {self.latest.name}")
+                return self.latest
+            self.latest = await asyncio.to_thread(self._create, source)
+            self._signature = signature
+            return self.latest
+
+
+backups = BackupManager(BACKUP_DIR, BACKUP_KEEP)
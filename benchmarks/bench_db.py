@@ -0,0 +1,118 @@
+"""
+⏱ database.py amallari: 10k / 100k / 1M qatorli bazada
+
+Vaqtinchalik bazada sxema migratsiyalar bilan yaratiladi, qatorlar sqlite3
+executemany bilan to'ldiriladi, so'ng haqiqiy async funksiyalar o'lchanadi.
+Asosiy so'rovlar indeks ishlatishi ham tekshiriladi (EXPLAIN QUERY PLAN).
+
+Ishga tushirish:
+    python benchmarks/bench_db.py
+"""
+
+import sys
+import random
+import sqlite3
+import tempfile
+import itertools
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import database  # noqa: E402
+from suite import measure_async  # noqa: E402
+
+SIZES = (10_000, 100_000, 1_000_000)
+SAMPLE = 1000
+
+# (so'rov, parametrlar) — jadvalni to'liq skanerlamasligi kerak
+QUERY_PLANS = [
+    ("SELECT * FROM pages WHERE user_id = ? ORDER BY created_at DESC LIMIT 1", (1,)),
+    ("DELETE FROM qr_files WHERE page_url = ? AND cache_key != ?", ("u", "k")),
+    ("SELECT version FROM pages WHERE id = ?", ("p",)),
+    ("SELECT source, SUM(views) FROM page_views WHERE page_id = ? GROUP BY source", ("p",)),
+]
+
+
+def populate(path: Path, rows: int):
+    """N ta sahifa (har bir userda ~2 ta), N ta qr_files va N ta page_views"""
+    con = sqlite3.connect(path)
+    con.execute("PRAGMA synchronous = OFF")
+    with con:
+        con.executemany(
+            "INSERT INTO pages (id, user_id, text, created_at) VALUES (?, ?, ?, datetime('now', ?))",
+            ((f"p{i:07d}", i // 2, "matn", f"-{i % 1000} minutes") for i in range(rows)),
+        )
+        con.executemany(
+            "INSERT INTO qr_files (cache_key, page_url, file_id) VALUES (?, ?, ?)",
+            ((f"k{i:07d}", f"https://example.com/page/p{i:07d}", f"file{i}") for i in range(rows)),
+        )
+        con.executemany(
+            "INSERT INTO page_views (page_id, hour, source, device, views) VALUES (?, ?, 'direct', 'mobile', 1)",
+            ((f"p{i // 24:07d}", f"2025-01-01 {i % 24:02d}:00") for i in range(rows)),
+        )
+    con.execute("ANALYZE")
+    con.close()
+
+
+def check_query_plans(path: Path):
+    con = sqlite3.connect(path)
+    for sql, params in QUERY_PLANS:
+        plan = " | ".join(row[3] for row in con.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+        if "SCAN" in plan and "USING" not in plan:
+            raise AssertionError(f"Indekssiz so'rov: {sql}\n  → {plan}")
+    con.close()
+
+
+async def bench_size(rows: int) -> dict[str, float]:
+    tmp = tempfile.TemporaryDirectory()
+    path = Path(tmp.name) / "bench.db"
+    database.pool = database.ConnectionPool(path, database.DB_READERS)
+    await database.init_db()
+    populate(path, rows)
+    check_query_plans(path)
+
+    rng = random.Random(42)
+    page_ids = itertools.cycle([f"p{rng.randrange(rows):07d}" for _ in range(SAMPLE)])
+    user_ids = itertools.cycle([rng.randrange(rows // 2) for _ in range(SAMPLE)])
+    counter = itertools.count()
+    views_batch = [(f"p{i:07d}", "2025-01-02 00:00", "direct", "mobile", 1) for i in range(100)]
+
+    async def get_page_cold():
+        # Qator keshisiz — haqiqiy SELECT
+        database.page_rows.clear()
+        await database.get_page(next(page_ids))
+
+    cases = {
+        "get_page": lambda: database.get_page(next(page_ids)),
+        "get_page.cold": get_page_cold,
+        "get_page_version": lambda: database.get_page_version(next(page_ids)),
+        "get_user_page": lambda: database.get_user_page(next(user_ids)),
+        "update_page": lambda: database.update_page(next(page_ids), {"text": "yangi"}),
+        "save_qr_file_id": lambda: database.save_qr_file_id(
+            f"new{next(counter)}", f"https://example.com/page/{next(page_ids)}", "file"
+        ),
+        "get_page_stats": lambda: database.get_page_stats(next(page_ids), "2025-01-01 12:00"),
+        "add_page_views.100": lambda: database.add_page_views(views_batch),
+    }
+    results = {}
+    try:
+        for name, fn in cases.items():
+            ops = await measure_async(fn, min_time=0.2)
+            results[f"db.{name}.{rows // 1000}k"] = ops
+            print(f"  {rows:>9,} qator  {name:<20} {ops:>10,.0f} op/s")
+    finally:
+        await database.close_db()
+        tmp.cleanup()
+    return results
+
+
+async def run(quick: bool = False) -> dict[str, float]:
+    results = {}
+    for rows in SIZES[:1] if quick else SIZES:
+        results.update(await bench_size(rows))
+    return results
+
+
+if __name__ == "__main__":
+    import asyncio
+    asyncio.run(run())
@@ -0,0 +1,101 @@
+"""
+⏱ server.landing_page: so'rov/s (in-process ASGI, tarmoqsiz)
+
+Holatlar: keshdan (br), 304 qayta tekshiruv, har safar qayta render va /qr.
+HTTP klient kutubxonasisiz — ASGI ilova to'g'ridan-to'g'ri chaqiriladi.
+
+Ishga tushirish:
+    python benchmarks/bench_landing.py
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import database  # noqa: E402
+import server  # noqa: E402
+from suite import measure_async  # noqa: E402
+
+PAGE_ID = "benchpage1"
+
+
+async def asgi_get(app, path: str, headers: dict[str, str] | None = None) -> tuple[int, dict, bytes]:
+    """Minimal ASGI GET: (status, sarlavhalar, body)"""
+    raw_path, _, query = path.partition("?")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": raw_path,
+        "raw_path": raw_path.encode(),
+        "root_path": "",
+        "query_string": query.encode(),
+        "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+    response = {"status": 0, "headers": {}, "body": b""}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = {k.decode(): v.decode() for k, v in message.get("headers", [])}
+        elif message["type"] == "http.response.body":
+            response["body"] += message.get("body", b"")
+
+    await app(scope, receive, send)
+    return response["status"], response["headers"], response["body"]
+
+
+async def run(quick: bool = False) -> dict[str, float]:
+    tmp = tempfile.TemporaryDirectory()
+    database.pool = database.ConnectionPool(Path(tmp.name) / "bench.db", database.DB_READERS)
+    await database.init_db()
+    await database.add_page(PAGE_ID, 1)
+    await database.update_page(PAGE_ID, {"text": "Benchmark matni " * 20, "title": "Bench"})
+
+    app = server.app
+    browser = {"accept-encoding": "gzip, deflate, br", "user-agent": "Mozilla/5.0 (iPhone; Mobile)"}
+    status, headers, _ = await asgi_get(app, f"/page/{PAGE_ID}", browser)
+    assert status == 200, status
+    revalidate = {**browser, "if-none-match": headers["etag"]}
+
+    async def cached():
+        await asgi_get(app, f"/page/{PAGE_ID}", browser)
+
+    async def not_modified():
+        status, _, _ = await asgi_get(app, f"/page/{PAGE_ID}", revalidate)
+        assert status == 304
+
+    async def rerender():
+        server.invalidate_page(PAGE_ID)
+        await asgi_get(app, f"/page/{PAGE_ID}", browser)
+
+    async def qr_http():
+        # GET /qr ommaviy — keshsiz chiziladi (har safar worker'da render)
+        await asgi_get(app, "/qr?data=https%3A%2F%2Fexample.com", browser)
+
+    cases = {"landing.cached": cached, "landing.304": not_modified, "landing.render": rerender, "qr.http": qr_http}
+    results = {}
+    try:
+        for name, fn in cases.items():
+            rps = await measure_async(fn)
+            results[name] = rps
+            print(f"  {name:<18} {rps:>10,.0f} so'rov/s")
+    finally:
+        # Ko'rishlar buferi flush qilinmaydi — vaqtinchalik baza bilan birga yo'qoladi
+        await database.close_db()
+        tmp.cleanup()
+    return results
+
+
+if __name__ == "__main__":
+    import asyncio
+    asyncio.run(run())
@@ -0,0 +1,65 @@
+"""
+⏱ QR generatsiya: payload uzunligi (→ QR versiya) va format bo'yicha
+
+Ishga tushirish:
+    python benchmarks/bench_qr.py
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import qrcode  # noqa: E402
+
+from qrgen import generate_qr_code, render_qr_code, resolve_style, memory_cache  # noqa: E402
+from suite import measure  # noqa: E402
+
+# H darajasida: ~v2, v5, v12, v23, v38
+PAYLOAD_LENGTHS = (16, 64, 256, 640, 1200)
+FORMATS = ("png", "png-palette", "svg")
+
+
+def payload(length: int) -> str:
+    base = "https://example.com/page/"
+    return (base + "x" * length)[:length]
+
+
+def version_of(data: str) -> int:
+    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_H)
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr.version
+
+
+async def run(quick: bool = False) -> dict[str, float]:
+    results = {}
+    lengths = PAYLOAD_LENGTHS[:3] if quick else PAYLOAD_LENGTHS
+    style = resolve_style()
+
+    for length in lengths:
+        data = payload(length)
+        # Keshsiz — har safar to'liq chizish (generate_qr_code'ning cache miss yo'li)
+        ops = measure(lambda: render_qr_code(data, style))
+        results[f"qr.render.len{length}"] = ops
+        print(f"  len {length:>5} (v{version_of(data):>2}): {ops:>8.1f} QR/s")
+
+    data = payload(256)
+    for fmt in FORMATS[1:]:
+        fmt_style = resolve_style(format=fmt)
+        ops = measure(lambda: render_qr_code(data, fmt_style))
+        results[f"qr.render.{fmt}.len256"] = ops
+        print(f"  {fmt:<12} len 256: {ops:>8.1f} QR/s")
+
+    # Xotira keshidan (kalit hisoblash + LRU)
+    memory_cache.clear()
+    generate_qr_code(data)
+    ops = measure(lambda: generate_qr_code(data))
+    results["qr.generate.memory_hit"] = ops
+    print(f"  xotira keshidan: {ops:>8.0f} QR/s")
+    return results
+
+
+if __name__ == "__main__":
+    import asyncio
+    asyncio.run(run())
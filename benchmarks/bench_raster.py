@@ -0,0 +1,77 @@
+"""
+⏱ QR rasterizatsiya benchmarki: StyledPilImage vs qr_raster (NumPy)
+
+Ishga tushirish:
+    python benchmarks/bench_raster.py
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import qrcode
+from qrcode.image.styledpil import StyledPilImage
+from qrcode.image.styles.moduledrawers import RoundedModuleDrawer
+from qrcode.image.styles.colormasks import SolidFillColorMask
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from qr_raster import rasterize  # noqa: E402
+
+BOX_SIZE = 12
+BORDER = 3
+FRONT = (30, 58, 138)
+BACK = (255, 255, 255)
+VERSIONS = [5, 10, 20, 30, 40]
+
+
+def make_qr(version: int) -> qrcode.QRCode:
+    qr = qrcode.QRCode(
+        version=version,
+        error_correction=qrcode.constants.ERROR_CORRECT_H,
+        box_size=BOX_SIZE,
+        border=BORDER,
+    )
+    qr.add_data("https://example.com/page/abcdef1234")
+    qr.make(fit=False)
+    return qr
+
+
+def styled(qr: qrcode.QRCode):
+    return qr.make_image(
+        image_factory=StyledPilImage,
+        module_drawer=RoundedModuleDrawer(),
+        color_mask=SolidFillColorMask(back_color=BACK, front_color=FRONT),
+    ).get_image()
+
+
+def vectorized(qr: qrcode.QRCode):
+    return rasterize(qr.get_matrix(), BORDER, BOX_SIZE, FRONT, BACK)
+
+
+def best_of(fn, qr, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn(qr)
+        best = min(best, time.perf_counter() - t)
+    return best
+
+
+def main():
+    print(f"{'versiya':>8} {'modul':>6} {'styled ms':>10} {'numpy ms':>10} {'tezlik':>8}  bir xil")
+    for version in VERSIONS:
+        qr = make_qr(version)
+        same = np.array_equal(np.asarray(styled(qr).convert("RGB")), np.asarray(vectorized(qr)))
+        slow = best_of(styled, qr, repeat=3)
+        fast = best_of(vectorized, qr, repeat=10)
+        print(
+            f"{version:>8} {qr.modules_count:>6} {slow * 1000:>10.1f} {fast * 1000:>10.2f} "
+            f"{slow / fast:>7.0f}x  {'✅' if same else '❌'}"
+        )
+        if not same:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+📨 Webhook o'tkazuvchanligi: soxta Telegram update'lar generatori
+
+Ikki rejim:
+- standart: shu jarayonda FastAPI + webhook.py ko'tariladi, handler esa
+  --handler-ms millisekund "ishlaydi" (Telegram'ga hech narsa yuborilmaydi)
+- --url: ishlab turgan serverga yuborish (BOT_MODE=webhook), masalan
+    python benchmarks/fake_updates.py --url http://localhost:8000/telegram/webhook --secret ...
+
+Ishga tushirish:
+    python benchmarks/fake_updates.py --updates 5000 --concurrency 64
+"""
+
+import sys
+import time
+import socket
+import asyncio
+import argparse
+import itertools
+from pathlib import Path
+
+import aiohttp
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+SECRET = "bench-secret"
+_update_ids = itertools.count(1)
+
+
+def fake_message(user_id: int, text: str) -> dict:
+    """Telegram'dagi oddiy matnli xabar update'i"""
+    update_id = next(_update_ids)
+    user = {"id": user_id, "is_bot": False, "first_name": f"User{user_id}"}
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private", "first_name": user["first_name"]},
+            "from": user,
+            "text": text,
+        },
+    }
+
+
+def percentile(values: list[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+async def fire(url: str, secret: str, total: int, concurrency: int, users: int) -> tuple[list[float], dict]:
+    """total ta update'ni concurrency ta parallel so'rov bilan yuborish"""
+    latencies = []
+    statuses: dict[int, int] = {}
+    headers = {"X-Telegram-Bot-Api-Secret-Token": secret}
+    sent = itertools.count()
+
+    async with aiohttp.ClientSession(headers=headers) as session:
+        async def client():
+            while (i := next(sent)) < total:
+                update = fake_message(100_000 + i % users, f"https://example.com/item/{i}")
+                t = time.perf_counter()
+                async with session.post(url, json=update) as response:
+                    await response.read()
+                latencies.append(time.perf_counter() - t)
+                statuses[response.status] = statuses.get(response.status, 0) + 1
+
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+    return latencies, statuses
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def run_local(args) -> None:
+    import uvicorn
+    from aiogram import Bot, Dispatcher, Router
+    from aiogram.types import Message
+    from fastapi import FastAPI
+
+    import webhook
+
+    webhook.WEBHOOK_WORKERS = args.workers
+    webhook.WEBHOOK_QUEUE = args.queue
+
+    handled = 0
+    all_done = asyncio.Event()
+    router = Router()
+
+    @router.message()
+    async def on_message(message: Message):
+        nonlocal handled
+        await asyncio.sleep(args.handler_ms / 1000)
+        handled += 1
+        if handled == args.updates:
+            all_done.set()
+
+    dp = Dispatcher()
+    dp.include_router(router)
+    bot = Bot(token="123456:BENCHMARK")
+    app = FastAPI()
+    updates = webhook.setup_webhook(app, dp, bot, SECRET)
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    updates.start()
+
+    try:
+        t = time.perf_counter()
+        latencies, statuses = await fire(
+            f"http://127.0.0.1:{port}{webhook.WEBHOOK_PATH}", SECRET,
+            args.updates, args.concurrency, args.users,
+        )
+        acked = time.perf_counter() - t
+        expected = statuses.get(200, 0)
+        if expected == args.updates:
+            await all_done.wait()
+        processed = time.perf_counter() - t
+        report(latencies, statuses, acked)
+        print(f"qayta ishlandi: {handled}/{expected} — {handled / processed:,.0f} update/s")
+    finally:
+        await updates.stop()
+        server.should_exit = True
+        await serving
+        await bot.session.close()
+
+
+def report(latencies: list[float], statuses: dict, elapsed: float):
+    print(f"yuborildi:      {len(latencies)} ta, {len(latencies) / elapsed:,.0f} so'rov/s")
+    print(f"javob kechikishi: p50 {percentile(latencies, 0.5) * 1000:.1f} ms, "
+          f"p99 {percentile(latencies, 0.99) * 1000:.1f} ms")
+    print(f"status kodlar:  {dict(sorted(statuses.items()))}")
+
+
+async def run_remote(args) -> None:
+    t = time.perf_counter()
+    latencies, statuses = await fire(args.url, args.secret, args.updates, args.concurrency, args.users)
+    report(latencies, statuses, time.perf_counter() - t)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--users", type=int, default=100, help="turli foydalanuvchilar soni")
+    parser.add_argument("--handler-ms", type=float, default=20, help="handler ishlash vaqti (lokal)")
+    parser.add_argument("--workers", type=int, default=8, help="WEBHOOK_WORKERS (lokal)")
+    parser.add_argument("--queue", type=int, default=10000, help="WEBHOOK_QUEUE (lokal)")
+    parser.add_argument("--url", help="ishlab turgan webhook manzili")
+    parser.add_argument("--secret", default="", help="WEBHOOK_SECRET (--url bilan)")
+    args = parser.parse_args()
+
+    asyncio.run(run_remote(args) if args.url else run_local(args))
+
+
+if __name__ == "__main__":
+    main()
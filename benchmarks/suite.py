@@ -0,0 +1,139 @@
+"""
+⏱ Benchmark to'plami — baseline bilan solishtirish
+
+Ishga tushirish:
+    python benchmarks/suite.py                    # hammasi, baseline bilan solishtirish
+    python benchmarks/suite.py qr db --quick      # tanlangan qismlar, kichik hajmlar
+    python benchmarks/suite.py --update-baseline  # joriy natijalarni baseline qilish
+
+Har bir metrika — soniyasiga amallar (ko'p = yaxshi). Natija baseline'dan
+--threshold (standart 25%) dan ko'proq past bo'lsa — exit code 1.
+Baseline mashinaga bog'liq: uni shu mashinada (yoki CI'da) yangilang.
+Shovqinli (umumiy/1 yadroli) mashinada --repeat ni oshiring: har bir holat
+shuncha marta o'lchanadi va eng yaxshisi olinadi.
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import importlib
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+sys.path.insert(0, str(BENCH_DIR))
+
+BASELINE_PATH = BENCH_DIR / "baseline.json"
+SUITES = {
+    "qr": "bench_qr",
+    "db": "bench_db",
+    "landing": "bench_landing",
+}
+# Har bir holat necha marta o'lchanadi (--repeat)
+REPEAT = 3
+
+
+# ─── O'lchash yordamchilari ─────────────────────────────────
+def measure(fn, min_time: float = 0.3, min_runs: int = 5) -> float:
+    """fn() ni kamida min_time va min_runs marta takrorlash; REPEAT urinishdan eng yaxshi ops/s"""
+    best = 0.0
+    for _ in range(REPEAT):
+        count = 0
+        start = time.perf_counter()
+        while (elapsed := time.perf_counter() - start) < min_time or count < min_runs:
+            fn()
+            count += 1
+        best = max(best, count / elapsed)
+    return best
+
+
+async def measure_async(fn, min_time: float = 0.3, min_runs: int = 5) -> float:
+    """await fn() uchun measure()"""
+    best = 0.0
+    for _ in range(REPEAT):
+        count = 0
+        start = time.perf_counter()
+        while (elapsed := time.perf_counter() - start) < min_time or count < min_runs:
+            await fn()
+            count += 1
+        best = max(best, count / elapsed)
+    return best
+
+
+def machine() -> dict:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+# ─── Solishtirish ───────────────────────────────────────────
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Baseline'dan threshold'dan ko'p yomonlashgan metrikalar"""
+    regressions = []
+    print(f"\n{'metrika':<44} {'joriy':>12} {'baseline':>12} {'farq':>8}")
+    for name, value in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<44} {value:>12,.1f} {'—':>12} {'yangi':>8}")
+            continue
+        change = value / base - 1
+        mark = ""
+        if change < -threshold:
+            mark = " ❌"
+            regressions.append(f"{name}: {value:,.1f} < {base:,.1f} ({change:+.0%})")
+        print(f"{name:<44} {value:>12,.1f} {base:>12,.1f} {change:>+7.0%}{mark}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("suites", nargs="*", help=f"qaysi qismlar: {', '.join(SUITES)} (standart: hammasi)")
+    parser.add_argument("--quick", action="store_true", help="kichik hajmlar (tez tekshiruv)")
+    parser.add_argument("--threshold", type=float, default=0.25, help="ruxsat etilgan pasayish (0.25 = 25%%)")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="har bir holat uchun urinishlar")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--output", type=Path, help="natijalarni JSON faylga yozish")
+    args = parser.parse_args()
+    unknown = set(args.suites) - set(SUITES)
+    if unknown:
+        parser.error(f"noma'lum qism: {', '.join(sorted(unknown))}")
+
+    # bench_* modullari "suite" ni import qiladi (bu fayl esa __main__)
+    importlib.import_module("suite").REPEAT = args.repeat
+
+    results: dict[str, float] = {}
+    for suite in args.suites or SUITES:
+        module = importlib.import_module(SUITES[suite])
+        print(f"▶ {suite}")
+        results.update(asyncio.run(module.run(quick=args.quick)))
+
+    if args.output:
+        args.output.write_text(json.dumps({"machine": machine(), "results": results}, indent=2))
+
+    stored = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {"results": {}}
+    if args.update_baseline:
+        stored["machine"] = machine()
+        stored["results"] = {**stored["results"], **results}
+        BASELINE_PATH.write_text(json.dumps(stored, indent=2, sort_keys=True) + "\n")
+        print(f"\n💾 Baseline yangilandi: {BASELINE_PATH.name} ({len(results)} ta metrika)")
+        return
+
+    if stored.get("machine") and stored["machine"] != machine():
+        print(f"\n⚠️ Baseline boshqa mashinada yozilgan: {stored['machine']}")
+    regressions = compare(results, stored["results"], args.threshold)
+    if regressions:
+        print(f"\n❌ {len(regressions)} ta metrika {args.threshold:.0%} dan ko'p yomonlashdi:")
+        for line in regressions:
+            print(f"  - {line}")
+        sys.exit(1)
+    print("\n✅ Regressiya yo'q")
+
+
+if __name__ == "__main__":
+    main()
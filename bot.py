@@ -3,44 +3,69 @@
 Audio, surat, matn → chiroyli landing sahifa → QR kod
 """
 
-import io
+# Birinchi import: ishga tushish vaqti shu yerdan o'lchanadi (aiogram importi ham kiradi)
+from startup import checkpoint, phase, warm_phase, warm_up, mark_ready
+
 import os
 import re
+import html
+import json
+import time
 import uuid
+import shutil
 import logging
 import asyncio
 from pathlib import Path
-
-import qrcode
-from qrcode.image.styledpil import StyledPilImage
-from qrcode.image.styles.moduledrawers import RoundedModuleDrawer
-from qrcode.image.styles.colormasks import SolidFillColorMask
-from PIL import Image, ImageDraw, ImageFont
+from collections import defaultdict
 
 from aiogram import Bot, Dispatcher, Router, F
 from aiogram.types import (
-    Message, CallbackQuery, BufferedInputFile,
-    InlineKeyboardMarkup, InlineKeyboardButton
+    Message, CallbackQuery, BufferedInputFile, InputMediaPhoto,
+    InlineKeyboardMarkup, InlineKeyboardButton,
+    InlineQuery, InlineQueryResultCachedPhoto
 )
 from aiogram.filters import CommandStart, Command
 from aiogram.enums import ParseMode
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.fsm.storage.memory import MemoryStorage
 
 from dotenv import load_dotenv
-import uvicorn
+load_dotenv()
+
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from aiogram.types import FSInputFile
-from database import init_db, add_page, get_page, get_user_page as db_get_user_page, update_page, delete_page_content, DB_PATH
-from server import app, MEDIA_DIR
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from database import init_db, close_db, add_page, get_user_page as db_get_user_page, update_page, delete_page_content
+from database import get_qr_file_id, save_qr_file_id, delete_qr_file_id, get_page_stats
+from database import add_batch_job, get_batch_job, update_batch_job, get_running_batch_jobs, acquire_lease, release_lease
+from cache import LRUCache
+from metrics import histogram
+from media import MEDIA_DIR, MEDIA_MAX_MB, MediaTooLarge, ingest, sweep_media
+from images import schedule_image_processing
+from audio import detect_ffmpeg, schedule_audio_processing
+from analytics import ANALYTICS_FLUSH_SECONDS, hour_bucket
+from qrgen import render_qr, qr_key, CACHE_DIR
+from qr_batch import BatchError, QR_BATCH_MAX, parse_csv, normalize_items, check_side, render_to_dir, zip_dir
+from workers import pool, spawn
+from fsm_storage import SQLiteStorage
+from leader import LeaderLock, INSTANCE_ID
+from backup import backups
+from webhook import BOT_MODE, WEBHOOK_PATH, webhook_secret, setup_webhook
 
 # ─── Sozlamalar ─────────────────────────────────────────────
-load_dotenv()
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 BASE_URL = os.getenv("BASE_URL", "http://localhost:8000")
 PORT = int(os.getenv("PORT", "8000"))
+# 0 — landing sahifalar alohida (web.py) jarayonlarda; bot jarayoni faqat bot
+SERVE_WEB = os.getenv("SERVE_WEB", "1") == "1"
+# SERVE_WEB=0 bo'lsa ham /metrics shu portda (0 — o'chirilgan)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
 BACKUP_ADMIN_ID = 7290906386
+# Kunlik yuborishdan tashqari serverdagi oraliq nusxalar (daqiqa, 0 — o'chirilgan)
+BACKUP_LOCAL_MINUTES = int(os.getenv("BACKUP_LOCAL_MINUTES", "0"))
+# Havolasiz media fayllarni tozalash oralig'i (daqiqa)
+MEDIA_GC_MINUTES = int(os.getenv("MEDIA_GC_MINUTES", "60"))
 
 if not BOT_TOKEN:
     raise ValueError("❌ BOT_TOKEN topilmadi! .env faylga token yozing.")
@@ -54,7 +79,27 @@ logger = logging.getLogger(__name__)
 
 # ─── Bot ────────────────────────────────────────────────────
 bot = Bot(token=BOT_TOKEN)
-storage = MemoryStorage()
+
+telegram_seconds = histogram("telegram_api_seconds", "Bot API chaqiruvlari vaqti", ("method", "status"))
+
+
+class TelegramMetrics(BaseRequestMiddleware):
+    """Har bir Bot API chaqiruvi vaqti (metod va natija bo'yicha)"""
+
+    async def __call__(self, make_request, bot, method):
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            status = type(e).__name__
+            raise
+        finally:
+            telegram_seconds.observe(time.perf_counter() - start, method=type(method).__name__, status=status)
+
+
+bot.session.middleware(TelegramMetrics())
+storage = SQLiteStorage()
 dp = Dispatcher(storage=storage)
 router = Router()
 
@@ -62,35 +107,60 @@ router = Router()
 ADMIN_IDS = [730841948, 7290906386]
 router.message.filter(F.from_user.id.in_(ADMIN_IDS))
 router.callback_query.filter(F.from_user.id.in_(ADMIN_IDS))
+# Inline rejim ham: aks holda istalgan foydalanuvchi disk keshi, cache chat va
+# qr_files'ni cheksiz to'ldira oladi
+router.inline_query.filter(F.from_user.id.in_(ADMIN_IDS))
 
 dp.include_router(router)
 
 # ─── Scheduler (Backup) ─────────────────────────────────────
 scheduler = AsyncIOScheduler()
+# Bir nechta bot jarayoni bo'lsa — rejalashtirilgan ishlarni faqat lider bajaradi
+leader = LeaderLock("scheduler")
 
+# Telegram Bot API hujjat chegarasi
+TELEGRAM_DOCUMENT_LIMIT = 50 * 1024 * 1024
+
+@leader.only
 async def send_backup():
-    """Bazani adminga yuborish"""
+    """Bazaning izchil nusxasini adminga yuborish (snapshot tugagandan keyin)"""
     try:
-        if DB_PATH.exists():
-            file = FSInputFile(DB_PATH)
-            await bot.send_document(
-                BACKUP_ADMIN_ID,
-                file,
-                caption=f"📦 <b>Database Backup</b>\n📅 {os.path.basename(DB_PATH)}",
-                parse_mode=ParseMode.HTML
-            )
-            logger.info("✅ Backup sent to admin")
-        else:
+        path = await backups.create()
+        if path is None:
             logger.warning("⚠️ Backup failed: DB file not found")
+            return
+        size = path.stat().st_size
+        if size > TELEGRAM_DOCUMENT_LIMIT:
+            logger.warning(f"⚠️ Backup Telegram uchun juda katta ({size / 1024 / 1024:.1f} MB) — faqat serverda: {path}")
+            return
+        await bot.send_document(
+            BACKUP_ADMIN_ID,
+            FSInputFile(path),
+            caption=f"📦 <b>Database Backup</b>\n📅 {path.name}",
+            parse_mode=ParseMode.HTML
+        )
+        logger.info("✅ Backup sent to admin")
     except Exception as e:
         logger.error(f"❌ Backup error: {e}")
 
+
+@leader.only
+async def local_backup():
+    """Serverdagi oraliq nusxa (baza o'zgarmagan bo'lsa — o'tkazib yuboriladi)"""
+    try:
+        await backups.create()
+    except Exception as e:
+        logger.error(f"❌ Local backup error: {e}")
+
 # Har kuni 08:00 da (Tashkent vaqti bilan taxminan UTC+5)
 # Server vaqti UTC bo'lsa, 08:00 Toshkent = 03:00 UTC
 scheduler.add_job(send_backup, 'cron', hour=3, minute=0)
+if BACKUP_LOCAL_MINUTES > 0:
+    scheduler.add_job(local_backup, 'interval', minutes=BACKUP_LOCAL_MINUTES)
 
 
 # ─── Keep-Alive (Koyeb uxlab qolmasligi uchun) ──────────────
+@leader.only
 async def keep_alive():
     """O'ziga o'zi ping yuboradi — server uxlab qolmasligi uchun"""
     import urllib.request
@@ -107,6 +177,18 @@ async def keep_alive():
 scheduler.add_job(keep_alive, 'interval', minutes=4)
 
 
+# ─── Media GC (havolasiz fayllarni tozalash) ────────────────
+@leader.only
+async def media_gc():
+    """Hech bir sahifa ishlatmayotgan media fayllarni o'chirish"""
+    try:
+        await sweep_media()
+    except Exception as e:
+        logger.error(f"❌ Media GC error: {e}")
+
+scheduler.add_job(media_gc, 'interval', minutes=MEDIA_GC_MINUTES)
+
+
 # ─── States ─────────────────────────────────────────────────
 class PageStates(StatesGroup):
     waiting_audio = State()
@@ -129,50 +211,25 @@ async def get_current_page(user_id: int) -> tuple[str, dict]:
     return page_id, {}
 
 
-def generate_qr_code(data: str) -> bytes:
-    """Chiroyli QR kod yaratish"""
-    qr = qrcode.QRCode(
-        version=None,
-        error_correction=qrcode.constants.ERROR_CORRECT_H,
-        box_size=12,
-        border=3,
-    )
-    qr.add_data(data)
-    qr.make(fit=True)
-
-    img = qr.make_image(
-        image_factory=StyledPilImage,
-        module_drawer=RoundedModuleDrawer(),
-        color_mask=SolidFillColorMask(
-            back_color=(255, 255, 255),
-            front_color=(30, 58, 138),
-        ),
-    )
-
-    if not isinstance(img, Image.Image):
-        img = img.convert("RGB")
-
-    qr_w, qr_h = img.size
-    pad = 40
-    cap_h = 50
-    canvas = Image.new("RGB", (qr_w + pad * 2, qr_h + pad + cap_h + pad), (255, 255, 255))
-    canvas.paste(img, (pad, pad // 2))
-
-    draw = ImageDraw.Draw(canvas)
-    caption = "📱 QR Code Generator Bot"
-    try:
-        font = ImageFont.truetype("arial.ttf", 18)
-    except (OSError, IOError):
-        font = ImageFont.load_default()
-
-    bbox = draw.textbbox((0, 0), caption, font=font)
-    tw = bbox[2] - bbox[0]
-    draw.text(((canvas.width - tw) // 2, qr_h + pad), caption, fill=(100, 116, 139), font=font)
-
-    buf = io.BytesIO()
-    canvas.save(buf, format="PNG", quality=95)
-    buf.seek(0)
-    return buf.getvalue()
+async def send_page_qr(message: Message, page_url: str, caption: str, show_progress: bool = False):
+    """Sahifa QR kodini yuborish — avval yuborilgan bo'lsa file_id orqali (chizmasdan, yuklamasdan)"""
+    key = qr_key(page_url)
+    file_id = await get_qr_file_id(key)
+    if file_id:
+        try:
+            await message.answer_photo(photo=file_id, caption=caption, parse_mode=ParseMode.HTML)
+            return
+        except TelegramBadRequest as e:
+            logger.warning(f"⚠️ Eski file_id ishlamadi, qayta yuklanadi: {e}")
+            await delete_qr_file_id(key)
+
+    processing = await message.answer("⏳ QR kod yaratilmoqda...") if show_progress else None
+    qr_bytes = await render_qr(page_url)
+    photo = BufferedInputFile(file=qr_bytes, filename="qrcode.png")
+    sent = await message.answer_photo(photo=photo, caption=caption, parse_mode=ParseMode.HTML)
+    await save_qr_file_id(key, page_url, sent.photo[-1].file_id)
+    if processing:
+        await processing.delete()
 
 
 def get_main_keyboard(page_id: str) -> InlineKeyboardMarkup:
@@ -211,7 +268,7 @@ def get_page_status(page: dict) -> str:
 # ─── /start ─────────────────────────────────────────────────
 @router.message(CommandStart())
 async def cmd_start(message: Message, state: FSMContext):
-    await state.clear()
+    await storage.clear(state.key)
     page_id, page = await get_current_page(message.from_user.id)
 
     welcome = (
@@ -239,31 +296,66 @@ async def cmd_help(message: Message):
         "📝 <b>Matn qo'shish</b> — matn yozing\n"
         "🔳 <b>QR kod</b> — sahifangiz uchun QR kod olasiz\n"
         "👁 <b>Ko'rish</b> — sahifangizni brauzerda ko'ring\n"
-        "🗑 <b>O'chirish</b> — hammasini tozalash\n\n"
+        "🗑 <b>O'chirish</b> — hammasini tozalash\n"
+        "📄 <b>.txt / .csv fayl</b> — har bir qator uchun QR kod (ZIP)\n\n"
         "─────────────────────\n"
         "/start — Bosh menyu\n"
         "/help — Yordam\n"
-        "/myqr — QR kodingizni olish"
+        "/myqr — QR kodingizni olish\n"
+        "/stats — Sahifa ko'rishlari (skanerlar)"
     )
     await message.answer(help_text, parse_mode=ParseMode.HTML)
 
 
+# ─── /stats ──────────────────────────────────────────────────
+SOURCE_LABELS = {
+    "direct": "📷 To'g'ridan-to'g'ri (QR skan)",
+    "telegram": "✈️ Telegram",
+    "search": "🔎 Qidiruv",
+    "social": "💬 Ijtimoiy tarmoq",
+    "other": "🌐 Boshqa saytlar",
+}
+DEVICE_LABELS = {"mobile": "📱 Telefon", "desktop": "💻 Kompyuter", "bot": "🤖 Bot / preview"}
+
+
+@router.message(Command("stats"))
+async def cmd_stats(message: Message):
+    page = await db_get_user_page(message.from_user.id)
+    if not page:
+        await message.answer("📭 Sizda hali sahifa yo'q. /start bosing.")
+        return
+
+    stats = await get_page_stats(page["id"], since_hour=hour_bucket(time.time() - 24 * 3600))
+    if not stats["total"]:
+        await message.answer("📊 Sahifangiz hali ochilmagan — QR kodni ulashing!")
+        return
+
+    sources = "\n".join(f"{SOURCE_LABELS.get(name, name)}: <b>{count}</b>" for name, count in stats["sources"])
+    devices = "\n".join(f"{DEVICE_LABELS.get(name, name)}: <b>{count}</b>" for name, count in stats["devices"])
+    await message.answer(
+        f"📊 <b>Sahifa statistikasi</b>\n\n"
+        f"👁 Jami ko'rishlar: <b>{stats['total']}</b>\n"
+        f"🕐 Oxirgi 24 soat: <b>{stats['recent']}</b>\n\n"
+        f"<b>Qayerdan:</b>\n{sources}\n\n"
+        f"<b>Qurilma:</b>\n{devices}\n\n"
+        f"<i>Ma'lumotlar ~{ANALYTICS_FLUSH_SECONDS:.0f} soniya kechikish bilan yangilanadi</i>",
+        parse_mode=ParseMode.HTML
+    )
+
+
 # ─── /myqr ───────────────────────────────────────────────────
 @router.message(Command("myqr"))
 async def cmd_myqr(message: Message):
     page_id, page = await get_current_page(message.from_user.id)
     page_url = f"{BASE_URL}/page/{page_id}"
 
-    qr_bytes = generate_qr_code(page_url)
-    photo = BufferedInputFile(file=qr_bytes, filename="qrcode.png")
-
     caption = (
         f"✅ <b>QR kodingiz tayyor!</b>\n\n"
         f"🔗 <b>Sahifa:</b>\n"
         f"<code>{page_url}</code>\n\n"
         f"📷 QR kodni skanerlang — sahifangiz ochiladi!"
     )
-    await message.answer_photo(photo=photo, caption=caption, parse_mode=ParseMode.HTML)
+    await send_page_qr(message, page_url, caption)
 
 
 # ─── Callback: Audio qo'shish ───────────────────────────────
@@ -321,10 +413,6 @@ async def cb_get_qr(callback: CallbackQuery):
         await callback.answer()
         return
 
-    processing = await callback.message.answer("⏳ QR kod yaratilmoqda...")
-    qr_bytes = generate_qr_code(page_url)
-    photo = BufferedInputFile(file=qr_bytes, filename="qrcode.png")
-
     caption = (
         f"✅ <b>QR kodingiz tayyor!</b>\n\n"
         f"🔗 <b>Sahifa:</b>\n"
@@ -332,8 +420,7 @@ async def cb_get_qr(callback: CallbackQuery):
         f"{get_page_status(page)}\n\n"
         f"📷 QR kodni skanerlang — sahifangiz ochiladi!"
     )
-    await callback.message.answer_photo(photo=photo, caption=caption, parse_mode=ParseMode.HTML)
-    await processing.delete()
+    await send_page_qr(callback.message, page_url, caption, show_progress=True)
     await callback.answer()
 
 
@@ -356,17 +443,10 @@ async def cb_view_page(callback: CallbackQuery):
 # ─── Callback: Hammasini o'chirish ───────────────────────────
 @router.callback_query(F.data == "delete_all")
 async def cb_delete_all(callback: CallbackQuery):
-    page_id, page = await get_current_page(callback.from_user.id)
-
-    # Media fayllarni o'chirish
-    for key in ["audio", "image"]:
-        filename = page.get(key)
-        if filename:
-            filepath = MEDIA_DIR / filename
-            if filepath.exists():
-                filepath.unlink()
+    page_id, _ = await get_current_page(callback.from_user.id)
 
-    # Sahifani tozalash (DB da null qilish)
+    # Sahifani tozalash (DB da null qilish) — media fayllarni, boshqa sahifa
+    # ishlatmasa, media GC o'chiradi
     await delete_page_content(page_id)
 
     await callback.message.answer(
@@ -380,30 +460,24 @@ async def cb_delete_all(callback: CallbackQuery):
 # ─── Audio qabul qilish ─────────────────────────────────────
 @router.message(PageStates.waiting_audio, F.audio | F.voice)
 async def receive_audio(message: Message, state: FSMContext):
-    page_id, page = await get_current_page(message.from_user.id)
-
-    # Eski audioni o'chirish
-    old_audio = page.get("audio")
-    if old_audio and (MEDIA_DIR / old_audio).exists():
-        (MEDIA_DIR / old_audio).unlink()
+    page_id, _ = await get_current_page(message.from_user.id)
 
     # Yangi audio yuklash
-    if message.audio:
-        file_id = message.audio.file_id
-        ext = "mp3"
-    else:
-        file_id = message.voice.file_id
-        ext = "ogg"
+    media = message.audio or message.voice
+    ext = "mp3" if message.audio else "ogg"
 
-    filename = f"{page_id}_audio.{ext}"
-    filepath = MEDIA_DIR / filename
-    await bot.download(file_id, destination=filepath)
+    try:
+        filename = await ingest(bot, media.file_id, media.file_unique_id, "audio", ext, media.file_size)
+    except MediaTooLarge:
+        await message.answer(f"❌ Fayl juda katta (maksimal {MEDIA_MAX_MB} MB).")
+        return
 
-    # Saqlash (SQLite)
-    await update_page(page_id, {"audio": filename})
-    await state.clear()
+    # Saqlash (SQLite) — striming nusxa va waveform fonda qayta yasaladi.
+    # Eski audio havolasi kamayadi; boshqa sahifa ishlatmasa, media GC o'chiradi
+    updated_page = await update_page(page_id, {"audio": filename, "audio_stream": None, "audio_peaks": None})
+    await storage.clear(state.key)
+    schedule_audio_processing(page_id, filename)
 
-    updated_page = await get_page(page_id)
     await message.answer(
         f"✅ <b>Audio saqlandi!</b>\n\n"
         f"{get_page_status(updated_page)}\n\n"
@@ -416,25 +490,23 @@ async def receive_audio(message: Message, state: FSMContext):
 # ─── Surat qabul qilish ─────────────────────────────────────
 @router.message(PageStates.waiting_image, F.photo)
 async def receive_image(message: Message, state: FSMContext):
-    page_id, page = await get_current_page(message.from_user.id)
-
-    # Eski suratni o'chirish
-    old_image = page.get("image")
-    if old_image and (MEDIA_DIR / old_image).exists():
-        (MEDIA_DIR / old_image).unlink()
+    page_id, _ = await get_current_page(message.from_user.id)
 
     # Eng katta o'lchamli suratni olish
     photo = message.photo[-1]
 
-    filename = f"{page_id}_image.jpg"
-    filepath = MEDIA_DIR / filename
-    await bot.download(photo.file_id, destination=filepath)
+    try:
+        filename = await ingest(bot, photo.file_id, photo.file_unique_id, "image", "jpg", photo.file_size)
+    except MediaTooLarge:
+        await message.answer(f"❌ Surat juda katta (maksimal {MEDIA_MAX_MB} MB).")
+        return
 
-    # Saqlash (SQLite)
-    await update_page(page_id, {"image": filename})
-    await state.clear()
+    # Saqlash (SQLite) — variantlar fonda qayta yasaladi.
+    # Eski surat havolasi kamayadi; boshqa sahifa ishlatmasa, media GC o'chiradi
+    updated_page = await update_page(page_id, {"image": filename, "image_variants": None, "image_placeholder": None})
+    await storage.clear(state.key)
+    schedule_image_processing(page_id, filename)
 
-    updated_page = await get_page(page_id)
     await message.answer(
         f"✅ <b>Surat saqlandi!</b>\n\n"
         f"{get_page_status(updated_page)}\n\n"
@@ -447,13 +519,12 @@ async def receive_image(message: Message, state: FSMContext):
 # ─── Matn qabul qilish ──────────────────────────────────────
 @router.message(PageStates.waiting_text, F.text)
 async def receive_text(message: Message, state: FSMContext):
-    page_id, page = await get_current_page(message.from_user.id)
+    page_id, _ = await get_current_page(message.from_user.id)
 
     # Saqlash (SQLite)
-    await update_page(page_id, {"text": message.text})
-    await state.clear()
+    updated_page = await update_page(page_id, {"text": message.text})
+    await storage.clear(state.key)
 
-    updated_page = await get_page(page_id)
     await message.answer(
         f"✅ <b>Matn saqlandi!</b>\n\n"
         f"{get_page_status(updated_page)}\n\n"
@@ -463,13 +534,220 @@ async def receive_text(message: Message, state: FSMContext):
     )
 
 
+# ─── Ommaviy QR (.txt / .csv hujjat) ────────────────────────
+BATCH_DIR = CACHE_DIR / "batches"
+BATCH_MAX_FILE_MB = 2
+BATCH_PROGRESS_INTERVAL = 3  # soniya — Telegram flood limitiga tushmaslik uchun
+# Bir vaqtda nechta ommaviy vazifa ishlaydi (qolganlari navbatda kutadi)
+batch_slots = asyncio.Semaphore(2)
+# Vazifa ijarasi — bir vazifani ikki jarayon bajarmasligi uchun
+BATCH_LEASE_TTL = 300
+# Shu jarayonda ishlayotgan (yoki navbatdagi) vazifalar
+_active_jobs: set[str] = set()
+
+
+async def run_batch_job(job: dict, resumed: bool = False):
+    """Vazifani bajarish: QR'lar papkaga, keyin bitta ZIP hujjat"""
+    job_id = job["id"]
+    lease = f"batch:{job_id}"
+    items = [tuple(item) for item in json.loads(job["items"])]
+    workdir = BATCH_DIR / job_id
+    zip_path = BATCH_DIR / f"{job_id}.zip"
+    loop = asyncio.get_running_loop()
+    task = asyncio.current_task()
+    last_edit = 0.0
+    lost = False
+
+    async def renew() -> bool:
+        """Ijarani uzaytirish; False — muddati o'tib, vazifa boshqa jarayonga o'tgan"""
+        nonlocal lost
+        lost = not await acquire_lease(lease, INSTANCE_ID, BATCH_LEASE_TTL)
+        return not lost
+
+    async def progress(done: int, total: int):
+        nonlocal last_edit
+        if done < total and loop.time() - last_edit < BATCH_PROGRESS_INTERVAL:
+            return
+        last_edit = loop.time()
+        if not await renew():
+            # Yangi egasi shu papkada davom etadi — chizishni shu yerda to'xtatamiz
+            task.cancel()
+            return
+        await update_batch_job(job_id, done=done)
+        try:
+            await bot.edit_message_text(
+                f"⏳ QR kodlar yaratilmoqda: <b>{done}/{total}</b>",
+                chat_id=job["chat_id"], message_id=job["message_id"], parse_mode=ParseMode.HTML
+            )
+        except TelegramBadRequest:
+            pass  # xabar o'chirilgan yoki matn o'zgarmagan
+
+    _active_jobs.add(job_id)
+    try:
+        async with batch_slots:
+            # Navbatda kutgan paytda boshqa jarayon olgan bo'lishi mumkin
+            if not await acquire_lease(lease, INSTANCE_ID, BATCH_LEASE_TTL):
+                return
+            current = await get_batch_job(job_id)
+            if current.get("status") != "running":
+                await release_lease(lease, INSTANCE_ID)
+                return
+            if resumed:
+                logger.info(f"📦 Ommaviy vazifa davom ettirilmoqda: {job_id} ({current['done']}/{current['total']})")
+            await _run_batch_job(job, items, workdir, zip_path, progress, renew)
+            await release_lease(lease, INSTANCE_ID)
+    except asyncio.CancelledError:
+        if not lost:
+            raise
+        task.uncancel()
+        logger.warning(f"⚠️ Ommaviy vazifa ijarasi boshqa jarayonga o'tdi — to'xtatildi: {job_id}")
+    finally:
+        _active_jobs.discard(job_id)
+
+
+async def _run_batch_job(job: dict, items: list, workdir: Path, zip_path: Path, progress, renew):
+    """ZIP yasash va yuborish (ijara olingandan keyin)"""
+    job_id = job["id"]
+    try:
+        errors = await render_to_dir(items, workdir, progress)
+        if not await renew():
+            # Vazifa endi boshqa jarayonniki — u ZIP'ni yig'adi, yuboradi va tozalaydi
+            logger.warning(f"⚠️ Ommaviy vazifa ijarasi boshqa jarayonga o'tdi — yuborilmadi: {job_id}")
+            return
+        await asyncio.to_thread(zip_dir, workdir, items, errors, zip_path)
+        await bot.send_document(
+            job["chat_id"],
+            FSInputFile(zip_path, filename="qrcodes.zip"),
+            caption=(
+                f"✅ <b>{len(items) - len(errors)} ta QR kod tayyor!</b>"
+                + (f"\n⚠️ Xatolar: {len(errors)} ta (errors.txt)" if errors else "")
+            ),
+            parse_mode=ParseMode.HTML
+        )
+        await update_batch_job(job_id, done=len(items), status="done")
+    except asyncio.CancelledError:
+        # To'xtatildi — fayllar qoladi, keyingi ishga tushishda davom etadi
+        raise
+    except Exception as e:
+        logger.error(f"❌ Ommaviy QR xato ({job_id}): {e}")
+        await update_batch_job(job_id, status="failed")
+        await bot.send_message(job["chat_id"], "❌ Ommaviy QR yaratishda xatolik yuz berdi.")
+    await asyncio.to_thread(shutil.rmtree, workdir, True)
+    zip_path.unlink(missing_ok=True)
+
+
+async def resume_batch_jobs():
+    """
+    Uzilib qolgan ommaviy vazifalarni davom ettirish. Lider buni muntazam
+    chaqiradi: to'xtagan jarayonning vazifasi ijarasi tugagach shu yerda olinadi.
+    """
+    for job in await get_running_batch_jobs():
+        if job["id"] not in _active_jobs:
+            spawn(run_batch_job(job, resumed=True))
+
+
+async def leader_tick():
+    """Lider ijarasini uzaytirish; lider bo'lsak — egasiz vazifalarni olish"""
+    if await leader.renew():
+        await resume_batch_jobs()
+
+
+@router.message(F.document)
+async def receive_batch_document(message: Message):
+    """Har bir qatori — bitta QR kod bo'lgan .txt / .csv hujjat"""
+    doc = message.document
+    name = (doc.file_name or "").lower()
+    if not name.endswith((".txt", ".csv")):
+        await message.answer("💡 Ommaviy QR uchun <b>.txt</b> yoki <b>.csv</b> fayl yuboring.", parse_mode=ParseMode.HTML)
+        return
+    if doc.file_size and doc.file_size > BATCH_MAX_FILE_MB * 1024 * 1024:
+        await message.answer(f"❌ Fayl juda katta (maksimal {BATCH_MAX_FILE_MB} MB).")
+        return
+
+    buf = await bot.download(doc.file_id)
+    text = buf.getvalue().decode("utf-8-sig", errors="replace")
+    if name.endswith(".csv"):
+        raw = parse_csv(text)
+    else:
+        raw = [(None, line.strip()) for line in text.splitlines() if line.strip()]
+
+    try:
+        items = normalize_items(raw)
+    except BatchError as e:
+        await message.answer(f"❌ {e}\n(maksimal {QR_BATCH_MAX} ta qator)")
+        return
+    try:
+        check_side(items)
+    except BatchError as e:
+        await message.answer(f"❌ {e}")
+        return
+
+    status = await message.answer(f"⏳ QR kodlar yaratilmoqda: <b>0/{len(items)}</b>", parse_mode=ParseMode.HTML)
+    job = {
+        "id": uuid.uuid4().hex[:12],
+        "chat_id": message.chat.id,
+        "message_id": status.message_id,
+        "items": json.dumps(items),
+    }
+    await add_batch_job(job["id"], message.from_user.id, job["chat_id"], job["message_id"], job["items"], len(items))
+    spawn(run_batch_job(job))
+
+
 # ─── URL QR kod (eski funksiya ham ishlaydi) ────────────────
 URL_PATTERN = re.compile(r'https?://[^\s<>"{}|\\^`\[\]]+')
+# Bitta foydalanuvchi uchun bir vaqtda nechta QR chiziladi
+URL_RENDER_PER_USER = 4
+# sendMediaGroup chegarasi
+ALBUM_SIZE = 10
+# Router faqat ADMIN_IDS ga ochiq — lug'at kichik bo'lib qoladi
+_user_render_slots = defaultdict(lambda: asyncio.Semaphore(URL_RENDER_PER_USER))
+
+
+def short_url(url: str, limit: int = 80) -> str:
+    return url if len(url) <= limit else url[:limit - 1] + "…"
+
+
+def url_caption(url: str) -> str:
+    return (
+        f"✅ <b>QR kod tayyor!</b>\n\n"
+        f"🔗 <code>{html.escape(url)}</code>\n\n"
+        f"📷 Skanerlang — link ochiladi!"
+    )
+
+
+async def render_urls(user_id: int, urls: list[str]) -> list[bytes | Exception]:
+    """URL'larni parallel chizish (foydalanuvchiga URL_RENDER_PER_USER tadan)"""
+    slots = _user_render_slots[user_id]
+
+    async def one(url: str) -> bytes:
+        async with slots:
+            return await render_qr(url)
+
+    return await asyncio.gather(*(one(url) for url in urls), return_exceptions=True)
+
+
+async def send_url_album(message: Message, chunk: list[tuple[str, bytes]]):
+    """Bitta rasm — oddiy foto, 2..10 ta — albom (bitta so'rov)"""
+    if len(chunk) == 1:
+        url, image = chunk[0]
+        photo = BufferedInputFile(file=image, filename="qrcode.png")
+        await message.answer_photo(photo=photo, caption=url_caption(url), parse_mode=ParseMode.HTML)
+        return
+    await message.answer_media_group([
+        InputMediaPhoto(
+            media=BufferedInputFile(file=image, filename=f"qrcode_{i}.png"),
+            caption=url_caption(url),
+            parse_mode=ParseMode.HTML,
+        )
+        for i, (url, image) in enumerate(chunk, start=1)
+    ])
+
 
 @router.message(F.text)
 async def handle_url(message: Message):
     """Oddiy URL yuborilsa — QR kod yaratish (eski funksiya)"""
-    urls = URL_PATTERN.findall(message.text.strip())
+    # Takroriy linklar bir marta (tartib saqlanadi)
+    urls = list(dict.fromkeys(URL_PATTERN.findall(message.text.strip())))
     if not urls:
         await message.answer(
             "💡 <b>Nima qilmoqchisiz?</b>\n\n"
@@ -479,21 +757,167 @@ async def handle_url(message: Message):
         )
         return
 
-    for url in urls:
+    processing = await message.answer(
+        "⏳ QR kod yaratilmoqda..." if len(urls) == 1 else f"⏳ {len(urls)} ta QR kod yaratilmoqda..."
+    )
+    results = await render_urls(message.from_user.id, urls)
+
+    ready = []
+    failed = []
+    for url, result in zip(urls, results):
+        if isinstance(result, Exception):
+            logger.error(f"QR kod xato ({short_url(url)}): {result}")
+            failed.append(url)
+        else:
+            ready.append((url, result))
+
+    for i in range(0, len(ready), ALBUM_SIZE):
+        chunk = ready[i:i + ALBUM_SIZE]
         try:
-            processing = await message.answer("⏳ QR kod yaratilmoqda...")
-            qr_bytes = generate_qr_code(url)
-            photo = BufferedInputFile(file=qr_bytes, filename="qrcode.png")
-            caption = (
-                f"✅ <b>QR kod tayyor!</b>\n\n"
-                f"🔗 <code>{url}</code>\n\n"
-                f"📷 Skanerlang — link ochiladi!"
-            )
-            await message.answer_photo(photo=photo, caption=caption, parse_mode=ParseMode.HTML)
-            await processing.delete()
+            await send_url_album(message, chunk)
         except Exception as e:
-            logger.error(f"QR kod xato: {e}")
-            await message.answer("❌ Xatolik yuz berdi. Qaytadan urinib ko'ring.", parse_mode=ParseMode.HTML)
+            logger.error(f"QR albom yuborilmadi: {e}")
+            failed.extend(url for url, _ in chunk)
+
+    try:
+        await processing.delete()
+    except TelegramBadRequest:
+        pass
+
+    if failed:
+        lines = "\n".join(f"• <code>{html.escape(short_url(url))}</code>" for url in failed)
+        await message.answer(
+            f"❌ <b>Quyidagi linklar uchun QR kod yaratilmadi ({len(failed)}/{len(urls)}):</b>\n\n"
+            f"{lines}\n\nQaytadan urinib ko'ring.",
+            parse_mode=ParseMode.HTML
+        )
+
+
+# ─── Inline rejim: @bot <matn> → QR kod ─────────────────────
+# Telegram inline natijada rasmni faqat URL yoki file_id bilan qabul qiladi:
+# QR bir marta INLINE_CACHE_CHAT ga yuklanadi, keyin file_id (qr_files) qaytariladi.
+# BotFather'da /setinline yoqilgan bo'lishi kerak.
+INLINE_CACHE_CHAT = int(os.getenv("INLINE_CACHE_CHAT", "0"))
+# Bir xil so'rov natijasini Telegram o'zi shuncha soniya keshlaydi
+INLINE_CACHE_TIME = int(os.getenv("INLINE_CACHE_TIME", "86400"))
+# Keshda yo'q so'rov chizilishidan oldin kutish — yozish davom etsa, eskisi tashlanadi
+INLINE_DEBOUNCE = float(os.getenv("INLINE_DEBOUNCE", "0.4"))
+# Javob shu vaqtdan kechikmasin (Telegram so'rovi ~10 soniyada eskiradi)
+INLINE_TIMEOUT = 5.0
+INLINE_MAX_LENGTH = 256
+# Bir vaqtda nechta QR cache chatga yuklanadi
+INLINE_UPLOADS = 2
+
+# Normallashgan matn → file_id (bazaga bormasdan)
+inline_file_ids = LRUCache(max_bytes=10_000, sizeof=lambda _: 1)
+# Bir xil matn bir vaqtda bir marta chiziladi/yuklanadi
+_inline_pending: dict[str, asyncio.Task] = {}
+_inline_upload_slots = asyncio.Semaphore(INLINE_UPLOADS)
+# Har bir foydalanuvchining oxirgi so'rovi (eskilari javobsiz qoladi)
+_inline_latest: dict[int, str] = {}
+
+
+def normalize_inline_query(query: str) -> str:
+    return " ".join(query.split())[:INLINE_MAX_LENGTH]
+
+
+async def cached_file_id(key: str) -> str | None:
+    """Avval yuklangan QR file_id: xotira → baza"""
+    file_id = inline_file_ids.get(key)
+    if file_id is None:
+        file_id = await get_qr_file_id(key)
+        if file_id:
+            inline_file_ids.set(key, file_id)
+    return file_id
+
+
+async def _upload_inline_qr(text: str, key: str) -> str:
+    """QR'ni chizib cache chatga yuklash va file_id'ni saqlash"""
+    async with _inline_upload_slots:
+        image = await render_qr(text)
+        sent = await bot.send_photo(
+            INLINE_CACHE_CHAT,
+            BufferedInputFile(file=image, filename="qrcode.png"),
+            caption=short_url(text),
+            disable_notification=True,
+        )
+    file_id = sent.photo[-1].file_id
+    await save_qr_file_id(key, text, file_id)
+    inline_file_ids.set(key, file_id)
+    return file_id
+
+
+async def upload_inline_qr(text: str, key: str) -> str:
+    """Bir xil matn bir vaqtda bir marta chiziladi va yuklanadi"""
+    task = _inline_pending.get(key)
+    if task is None:
+        task = asyncio.create_task(_upload_inline_qr(text, key))
+        _inline_pending[key] = task
+        task.add_done_callback(lambda _: _inline_pending.pop(key, None))
+    # shield: javob vaqti tugasa ham yuklash davom etadi — keyingi so'rov keshdan oladi
+    return await asyncio.shield(task)
+
+
+def inline_result(key: str, file_id: str, text: str) -> InlineQueryResultCachedPhoto:
+    return InlineQueryResultCachedPhoto(
+        id=key[:32],
+        photo_file_id=file_id,
+        title=short_url(text, 40),
+        caption=f"🔳 <code>{html.escape(text)}</code>",
+        parse_mode=ParseMode.HTML,
+    )
+
+
+async def answer_own_page(query: InlineQuery):
+    """Bo'sh so'rov: foydalanuvchi sahifasining QR kodi (avval yuborilgan bo'lsa)"""
+    results = []
+    page = await db_get_user_page(query.from_user.id)
+    if page:
+        page_url = f"{BASE_URL}/page/{page['id']}"
+        key = qr_key(page_url)
+        file_id = await cached_file_id(key)
+        if file_id:
+            results.append(inline_result(key, file_id, page_url))
+    await query.answer(results, cache_time=60, is_personal=True)
+
+
+@router.inline_query()
+async def handle_inline(query: InlineQuery):
+    """Inline so'rov: keshda bo'lsa darhol, bo'lmasa debounce'dan keyin chizib yuklash"""
+    text = normalize_inline_query(query.query)
+    if not text:
+        await answer_own_page(query)
+        return
+    if not INLINE_CACHE_CHAT:
+        await query.answer([], cache_time=60)
+        return
+
+    user_id = query.from_user.id
+    _inline_latest[user_id] = query.id
+    key = qr_key(text)
+    try:
+        file_id = await cached_file_id(key)
+        if file_id is None:
+            await asyncio.sleep(INLINE_DEBOUNCE)
+            if _inline_latest.get(user_id) != query.id:
+                # Foydalanuvchi yozishda davom etdi — bu so'rov endi kerak emas
+                return
+            file_id = await asyncio.wait_for(upload_inline_qr(text, key), INLINE_TIMEOUT)
+        await query.answer([inline_result(key, file_id, text)], cache_time=INLINE_CACHE_TIME)
+    except asyncio.TimeoutError:
+        # Yuklash fonda tugaydi; Telegram bo'sh javobni keshlamasin — keyingi so'rovda tayyor
+        await query.answer([], cache_time=1)
+    except TelegramBadRequest as e:
+        logger.warning(f"⚠️ Inline javob xato: {e}")
+        if "query" not in e.message.lower():
+            # Kechikkan javob emas — file_id eskirgan, keyingi safar qayta yuklanadi
+            inline_file_ids.pop(key)
+            await delete_qr_file_id(key)
+    except Exception as e:
+        logger.error(f"❌ Inline QR xato: {e}")
+    finally:
+        if _inline_latest.get(user_id) == query.id:
+            del _inline_latest[user_id]
 
 
 # ─── Botni ishga tushirish ──────────────────────────────────
@@ -504,31 +928,84 @@ async def start_bot():
     await dp.start_polling(bot)
 
 
-async def start_server():
-    """FastAPI server"""
-    logger.info(f"🌐 Server ishga tushmoqda: port {PORT}")
-    config = uvicorn.Config(app, host="0.0.0.0", port=PORT, log_level="info")
+async def start_webhook(updates):
+    """Webhook: update'lar server.app orqali keladi"""
+    url = f"{BASE_URL}{WEBHOOK_PATH}"
+    logger.info(f"🤖 Bot webhook rejimida: {url}")
+    updates.start()
+    await bot.set_webhook(
+        url,
+        secret_token=webhook_secret(BOT_TOKEN),
+        allowed_updates=dp.resolve_used_update_types(),
+        drop_pending_updates=True,
+    )
+
+
+async def start_server(application, port: int = PORT):
+    """FastAPI server (uvicorn faqat shu yerda yuklanadi)"""
+    import uvicorn
+
+    logger.info(f"🌐 Server ishga tushmoqda: port {port}")
+    config = uvicorn.Config(application, host="0.0.0.0", port=port, log_level="info")
     server = uvicorn.Server(config)
     await server.serve()
 
 
 async def main():
+    checkpoint("imports")
     logger.info("🚀 QR Code Generator Bot + Server ishga tushmoqda...")
     logger.info(f"🌐 Landing sahifalar: {BASE_URL}")
 
     # Bazani ishga tushirish
-    await init_db()
+    with phase("db"):
+        await init_db()
     logger.info("📦 SQLite baza tayyor")
 
-    # Backup scheduler
-    scheduler.start()
-    logger.info("⏰ Backup scheduler ishga tushdi (har kuni 08:00 UZT)")
+    # Ixtiyoriy bog'liqliklar
+    detect_ffmpeg()
+    if not INLINE_CACHE_CHAT:
+        logger.warning("⚠️ INLINE_CACHE_CHAT berilmagan — inline rejimda faqat o'z sahifa QR'i")
+
+    # Server birinchi ko'tariladi: warm-up davomida /health → 503 "starting".
+    # Webhook update'lari ham HTTP orqali keladi — server shart.
+    # FastAPI/uvicorn faqat kerak bo'lsa yuklanadi (SERVE_WEB=0 + polling — yuklanmaydi)
+    web = SERVE_WEB or BOT_MODE == "webhook"
+    updates = None
+    server_task = None
+    if web or METRICS_PORT:
+        with phase("import_server"):
+            from server import app, metrics_app, warm_templates
+        if BOT_MODE == "webhook":
+            updates = setup_webhook(app, dp, bot, webhook_secret(BOT_TOKEN))
+        server_task = asyncio.create_task(
+            start_server(app) if web else start_server(metrics_app, METRICS_PORT)
+        )
 
-    # Bot va Server'ni parallel ishga tushirish
-    await asyncio.gather(
-        start_bot(),
-        start_server()
-    )
+    try:
+        # Warm-up: sahifa keshi, QR worker'lar, shablon
+        await warm_up()
+        if web:
+            with warm_phase("templates"):
+                warm_templates()
+
+        # Liderlik (scheduler ishlari) + uzilib qolgan ommaviy vazifalar
+        with phase("scheduler"):
+            await leader_tick()
+            scheduler.add_job(leader_tick, 'interval', seconds=leader.renew_interval)
+            scheduler.start()
+        logger.info("⏰ Backup scheduler ishga tushdi (har kuni 08:00 UZT)")
+
+        mark_ready()
+        bot_task = start_webhook(updates) if updates else start_bot()
+        await asyncio.gather(bot_task, *([server_task] if server_task else []))
+    finally:
+        if updates:
+            await updates.stop()
+        if scheduler.running:
+            scheduler.shutdown(wait=False)
+        await leader.release()
+        await pool.shutdown()
+        await close_db()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,123 @@
+"""
+🗃 Kesh yordamchilari — xotira (LRU) va disk (content-addressed)
+"""
+
+import os
+import time
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache:
+    """
+    Hajm (bayt) bo'yicha cheklangan LRU kesh.
+    sizeof=lambda _: 1 bilan — yozuvlar soni bo'yicha; ttl (soniya) berilsa —
+    eskirgan yozuv topilmagan hisoblanadi.
+    """
+
+    def __init__(self, max_bytes: int, sizeof=len, ttl: float | None = None):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.ttl = ttl
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict = OrderedDict()
+        self._expires: dict = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            if self.ttl is not None and self._expires[key] < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def _remove(self, key):
+        value = self._data.pop(key)
+        self._expires.pop(key, None)
+        self.size -= self.sizeof(value)
+        return value
+
+    def set(self, key, value):
+        size = self.sizeof(value)
+        # Juda katta qiymatni keshlamaymiz — hammasini siqib chiqarardi
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = value
+            if self.ttl is not None:
+                self._expires[key] = time.monotonic() + self.ttl
+            self.size += size
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self._data)))
+
+    def pop(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            return self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._expires.clear()
+            self.size = 0
+
+    def __contains__(self, key) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class DiskCache:
+    """Diskdagi kesh: har bir kalit — alohida fayl (kalit = kontent hash)"""
+
+    def __init__(self, directory: Path, suffix: str = ".bin"):
+        self.directory = Path(directory)
+        self.suffix = suffix
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def path(self, key: str) -> Path:
+        # Bitta papkada minglab fayl bo'lmasligi uchun 2 harfli prefiks
+        return self.directory / key[:2] / f"{key}{self.suffix}"
+
+    def get(self, key: str) -> bytes | None:
+        try:
+            return self.path(key).read_bytes()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(f"⚠️ Disk kesh o'qish xato ({key}): {e}")
+            return None
+
+    def set(self, key: str, data: bytes):
+        """Atomar yozish: vaqtinchalik fayl → rename"""
+        path = self.path(key)
+        tmp = None
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"⚠️ Disk kesh yozish xato ({key}): {e}")
+            if tmp and os.path.exists(tmp):
+                os.unlink(tmp)
@@ -1,86 +1,667 @@
+import os
+import time
+import asyncio
 import aiosqlite
 import logging
+from contextlib import asynccontextmanager
 from pathlib import Path
 
+from cache import LRUCache
+from metrics import histogram, register_cache, timed_async
+
 # Log
 logger = logging.getLogger(__name__)
 
 DB_NAME = "bot.db"
 BASE_DIR = Path(__file__).parent
 DB_PATH = BASE_DIR / DB_NAME
+DB_READERS = int(os.getenv("DB_READERS", "4"))
+# Sahifa qatorlari keshi: yozuvlar soni va yashash muddati (soniya)
+PAGE_ROW_CACHE = int(os.getenv("PAGE_ROW_CACHE", "10000"))
+PAGE_ROW_TTL = float(os.getenv("PAGE_ROW_TTL", "30"))
+
+# Har bir ulanish uchun sozlamalar
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -8000",
+)
+
+
+class ConnectionPool:
+    """Doimiy ulanishlar: bitta yozuvchi + bir nechta o'quvchi (WAL rejimida)"""
+
+    def __init__(self, path: Path, readers: int):
+        self.path = path
+        self.reader_count = max(1, readers)
+        self._writer: aiosqlite.Connection | None = None
+        self._write_lock = asyncio.Lock()
+        self._readers: asyncio.Queue | None = None
+        self._all_readers: list[aiosqlite.Connection] = []
+
+    @property
+    def is_open(self) -> bool:
+        return self._writer is not None
+
+    async def _connect(self) -> aiosqlite.Connection:
+        db = await aiosqlite.connect(self.path, cached_statements=256)
+        db.row_factory = aiosqlite.Row
+        for pragma in PRAGMAS:
+            await db.execute(pragma)
+        return db
+
+    async def open(self):
+        if self.is_open:
+            return
+        # Yozuvchi birinchi ochiladi — WAL rejimini u o'rnatadi
+        self._writer = await self._connect()
+        self._readers = asyncio.Queue()
+        for _ in range(self.reader_count):
+            db = await self._connect()
+            self._all_readers.append(db)
+            self._readers.put_nowait(db)
+
+    async def close(self):
+        if not self.is_open:
+            return
+        async with self._write_lock:
+            for db in self._all_readers:
+                await db.close()
+            self._all_readers.clear()
+            self._readers = None
+            writer, self._writer = self._writer, None
+            await writer.close()
+
+    @asynccontextmanager
+    async def read(self):
+        """O'qish uchun ulanish (yozuvlarni kutmaydi)"""
+        if not self.is_open:
+            raise RuntimeError("Baza ochilmagan — avval init_db() chaqiring")
+        db = await self._readers.get()
+        try:
+            yield db
+        finally:
+            self._readers.put_nowait(db)
+
+    @asynccontextmanager
+    async def write(self):
+        """Yozish uchun yagona ulanish — tranzaksiya oxirida commit"""
+        if not self.is_open:
+            raise RuntimeError("Baza ochilmagan — avval init_db() chaqiring")
+        async with self._write_lock:
+            try:
+                yield self._writer
+            except BaseException:
+                await self._writer.rollback()
+                raise
+            else:
+                await self._writer.commit()
+
+
+pool = ConnectionPool(DB_PATH, DB_READERS)
+
+# Har bir so'rov funksiyasi vaqti (ulanish/qulf kutish ham kiradi)
+db_seconds = histogram("db_query_seconds", "database.py funksiyalari vaqti", ("op",))
+timed_db = timed_async(db_seconds, "op")
+
+# ─── Sahifa qatorlari keshi (read-through) ──────────────────
+# page_id → qator, user_id → page_id. Faqat haqiqatan bor qatorlar keshlanadi:
+# "yo'q" javobi keshlansa, boshqa jarayon yaratgan sahifa TTL davomida ko'rinmay
+# qoladi va ikkinchi sahifa ochilib ketadi. Shu jarayondagi
+# yozuvlar keshni RETURNING natijasi bilan yangilaydi (qayta o'qishsiz);
+# boshqa jarayon yozgan o'zgarishlar ko'pi bilan PAGE_ROW_TTL da ko'rinadi.
+page_rows = LRUCache(max_bytes=PAGE_ROW_CACHE, sizeof=lambda _: 1, ttl=PAGE_ROW_TTL)
+user_pages = LRUCache(max_bytes=PAGE_ROW_CACHE, sizeof=lambda _: 1, ttl=PAGE_ROW_TTL)
+register_cache("page_rows", page_rows)
+register_cache("user_pages", user_pages)
+
+# Sahifa o'zgarganda chaqiriladigan funksiyalar (keshlarni tozalash uchun)
+_page_listeners = []
+
+
+def on_page_change(callback):
+    """callback(page_id) — sahifa yozilganda chaqiriladi"""
+    _page_listeners.append(callback)
+    return callback
+
+
+def _notify_page_change(page_id: str):
+    for callback in _page_listeners:
+        try:
+            callback(page_id)
+        except Exception as e:
+            logger.error(f"❌ Sahifa listener xato ({page_id}): {e}")
+
+
+# ─── Migratsiyalar ──────────────────────────────────────────
+# Har bir element — bitta versiya (PRAGMA user_version). Faqat oxiriga qo'shing!
+MIGRATIONS = [
+    # 1: boshlang'ich sxema
+    (
+        """
+        CREATE TABLE IF NOT EXISTS pages (
+            id TEXT PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            audio TEXT,
+            image TEXT,
+            text TEXT,
+            title TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        # Telegram'ga yuborilgan QR rasmlar (qayta yuklamaslik uchun file_id)
+        """
+        CREATE TABLE IF NOT EXISTS qr_files (
+            cache_key TEXT PRIMARY KEY,
+            page_url TEXT NOT NULL,
+            file_id TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ),
+    # 2: get_user_page va save_qr_file_id uchun indekslar
+    (
+        "CREATE INDEX IF NOT EXISTS idx_pages_user_created ON pages (user_id, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_qr_files_page_url ON qr_files (page_url)",
+    ),
+    # 3: surat variantlari (WebP srcset) va blur placeholder
+    (
+        "ALTER TABLE pages ADD COLUMN image_variants TEXT",
+        "ALTER TABLE pages ADD COLUMN image_placeholder TEXT",
+    ),
+    # 4: audio striming nusxasi va waveform sidecar
+    (
+        "ALTER TABLE pages ADD COLUMN audio_stream TEXT",
+        "ALTER TABLE pages ADD COLUMN audio_peaks TEXT",
+    ),
+    # 5: bot orqali ommaviy QR generatsiya (qayta ishga tushganda davom ettiriladi)
+    (
+        """
+        CREATE TABLE IF NOT EXISTS batch_jobs (
+            id TEXT PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            chat_id INTEGER NOT NULL,
+            message_id INTEGER NOT NULL,
+            items TEXT NOT NULL,
+            total INTEGER NOT NULL,
+            done INTEGER NOT NULL DEFAULT 0,
+            status TEXT NOT NULL DEFAULT 'running',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_batch_jobs_status ON batch_jobs (status)",
+    ),
+    # 6: bir nechta jarayon — FSM holatlari, lider/vazifa ijarasi (lease),
+    # sahifa versiyasi (boshqa jarayonlardagi keshlar eskirganini bilish uchun)
+    (
+        "ALTER TABLE pages ADD COLUMN version INTEGER NOT NULL DEFAULT 0",
+        """
+        CREATE TABLE IF NOT EXISTS fsm_states (
+            key TEXT PRIMARY KEY,
+            state TEXT,
+            data TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS leases (
+            name TEXT PRIMARY KEY,
+            owner TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        )
+        """,
+    ),
+    # 7: landing sahifa ko'rishlari (soatlik, manba va qurilma bo'yicha)
+    (
+        """
+        CREATE TABLE IF NOT EXISTS page_views (
+            page_id TEXT NOT NULL,
+            hour TEXT NOT NULL,
+            source TEXT NOT NULL,
+            device TEXT NOT NULL,
+            views INTEGER NOT NULL,
+            PRIMARY KEY (page_id, hour, source, device)
+        ) WITHOUT ROWID
+        """,
+    ),
+    # 8: media fayllar — kontent bo'yicha bitta nusxa (blob), Telegram file_unique_id
+    # xaritasi va sahifalardan havolalar soni (trigger'lar yuritadi). refs 0 ga tushgan
+    # vaqt GC uchun saqlanadi; mavjud sahifalar fayllari shu yerda hisobga olinadi
+    (
+        """
+        CREATE TABLE IF NOT EXISTS media_blobs (
+            filename TEXT PRIMARY KEY,
+            refs INTEGER NOT NULL DEFAULT 0,
+            unreferenced_at REAL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_media_blobs_unreferenced ON media_blobs (unreferenced_at) WHERE refs <= 0",
+        """
+        CREATE TABLE IF NOT EXISTS media_sources (
+            file_unique_id TEXT PRIMARY KEY,
+            filename TEXT NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_media_sources_filename ON media_sources (filename)",
+        """
+        INSERT OR IGNORE INTO media_blobs (filename, refs)
+        SELECT name, COUNT(*) FROM (
+            SELECT audio AS name FROM pages WHERE audio IS NOT NULL
+            UNION ALL
+            SELECT image FROM pages WHERE image IS NOT NULL
+        ) GROUP BY name
+        """,
+        # Avval yangisini oshirib, keyin eskisini kamaytiramiz — bir xil fayl bo'lsa 0 ga tushmaydi
+        """
+        CREATE TRIGGER IF NOT EXISTS pages_media_update AFTER UPDATE OF audio, image ON pages
+        BEGIN
+            UPDATE media_blobs SET refs = refs + 1, unreferenced_at = NULL
+            WHERE filename IN (NEW.audio, NEW.image);
+            UPDATE media_blobs SET refs = refs - 1,
+                unreferenced_at = CASE WHEN refs <= 1 THEN CAST(strftime('%s', 'now') AS REAL) ELSE unreferenced_at END
+            WHERE filename IN (OLD.audio, OLD.image);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS pages_media_delete AFTER DELETE ON pages
+        BEGIN
+            UPDATE media_blobs SET refs = refs - 1,
+                unreferenced_at = CASE WHEN refs <= 1 THEN CAST(strftime('%s', 'now') AS REAL) ELSE unreferenced_at END
+            WHERE filename IN (OLD.audio, OLD.image);
+        END
+        """,
+    ),
+]
+
+
+async def migrate():
+    """Qo'llanmagan migratsiyalarni ketma-ket bajarish"""
+    for version, statements in enumerate(MIGRATIONS, start=1):
+        # Har bir migratsiya — alohida tranzaksiya. BEGIN IMMEDIATE yozish qulfini
+        # darhol oladi: bir vaqtda ishga tushgan jarayonlardan faqat bittasi qo'llaydi
+        async with pool.write() as db:
+            await db.execute("BEGIN IMMEDIATE")
+            async with db.execute("PRAGMA user_version") as cursor:
+                current = (await cursor.fetchone())[0]
+            if version <= current:
+                continue
+            for sql in statements:
+                await db.execute(sql)
+            await db.execute(f"PRAGMA user_version = {version}")
+        logger.info(f"📦 Migratsiya qo'llandi: v{version}")
+
 
 async def init_db():
-    """Baza jadvallarini yaratish"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS pages (
-                id TEXT PRIMARY KEY,
-                user_id INTEGER NOT NULL,
-                audio TEXT,
-                image TEXT,
-                text TEXT,
-                title TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        await db.commit()
-    logger.info("📦 Baza ishga tushdi: pages jadvali tayyor")
+    """Baza ulanishlarini ochish va migratsiyalarni qo'llash"""
+    await pool.open()
+    await migrate()
+    logger.info(f"📦 Baza ishga tushdi: sxema v{len(MIGRATIONS)}")
+
+async def close_db():
+    """Ulanishlarni yopish (to'xtashda)"""
+    await pool.close()
+    logger.info("📦 Baza ulanishlari yopildi")
 
+@timed_db
 async def add_page(page_id: str, user_id: int):
     """Yangi sahifa qo'shish"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute(
-            "INSERT OR IGNORE INTO pages (id, user_id) VALUES (?, ?)",
+    async with pool.write() as db:
+        # execute_fetchall — bitta thread o'tishi (execute + fetchall + close alohida emas)
+        rows = await db.execute_fetchall(
+            "INSERT OR IGNORE INTO pages (id, user_id) VALUES (?, ?) RETURNING *",
             (page_id, user_id)
         )
-        await db.commit()
+    if rows:
+        page_rows.set(page_id, dict(rows[0]))
+        user_pages.set(user_id, page_id)
+    else:
+        page_rows.pop(page_id)
+    _notify_page_change(page_id)
 
-async def get_page(page_id: str) -> dict:
-    """Sahifani olish"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
+@timed_db
+async def get_page(page_id: str, version: int | None = None) -> dict:
+    """
+    Sahifani olish (keshdan yoki bazadan).
+    version berilsa — keshdagi qator shu versiyada bo'lmasa, bazadan qayta o'qiladi.
+    """
+    page = page_rows.get(page_id)
+    if page is not None and (version is None or page.get("version") == version):
+        return dict(page)
+
+    async with pool.read() as db:
         async with db.execute("SELECT * FROM pages WHERE id = ?", (page_id,)) as cursor:
             row = await cursor.fetchone()
-            if row:
-                return dict(row)
-            return {}
+    if not row:
+        return {}
+    page = dict(row)
+    page_rows.set(page_id, page)
+    return dict(page)
 
+@timed_db
+async def get_page_version(page_id: str) -> int | None:
+    """
+    Sahifa versiyasi (har bir yozuvda oshadi); sahifa yo'q bo'lsa — None.
+    Keshlanmaydi: boshqa jarayonlar yozgan o'zgarishlarni shu orqali bilamiz.
+    """
+    async with pool.read() as db:
+        async with db.execute("SELECT version FROM pages WHERE id = ?", (page_id,)) as cursor:
+            row = await cursor.fetchone()
+            return row[0] if row else None
+
+@timed_db
 async def get_user_page(user_id: int) -> dict:
     """Userning sahifasini topish"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    page_id = user_pages.get(user_id)
+    if page_id is not None:
+        page = await get_page(page_id)
+        if page:
+            return page
+
+    async with pool.read() as db:
         # Oxirgi yaratilgan sahifani olamiz (agar ko'p bo'lsa)
         async with db.execute(
             "SELECT * FROM pages WHERE user_id = ? ORDER BY created_at DESC LIMIT 1",
             (user_id,)
         ) as cursor:
             row = await cursor.fetchone()
-            if row:
-                return dict(row)
-            return {}
+    if not row:
+        return {}
+    page = dict(row)
+    page_rows.set(page["id"], page)
+    user_pages.set(user_id, page["id"])
+    return dict(page)
+
+@timed_db
+async def prime_page_cache(limit: int) -> int:
+    """Eng yangi limit ta sahifani qatorlar keshiga olish (warm-up)"""
+    async with pool.read() as db:
+        rows = await db.execute_fetchall("SELECT * FROM pages ORDER BY rowid DESC LIMIT ?", (limit,))
+    for row in rows:
+        page = dict(row)
+        page_rows.set(page["id"], page)
+    return len(rows)
 
-async def update_page(page_id: str, data: dict):
-    """Sahifani yangilash (audio, image, text)"""
+def _cache_written(rows) -> dict:
+    """Yozuvdan qaytgan (RETURNING) qatorni keshga qo'yish"""
+    if not rows:
+        return {}
+    page = dict(rows[0])
+    page_rows.set(page["id"], page)
+    return dict(page)
+
+@timed_db
+async def update_page(page_id: str, data: dict, expected: dict | None = None) -> dict:
+    """
+    Sahifani yangilash (audio, image, text); yangilangan qator qaytadi.
+    expected berilsa — compare-and-set: ustunlar hali ham shu qiymatda bo'lsagina
+    yoziladi, aks holda (bu orada boshqa yozuv tushgan) {} qaytadi.
+    """
     # data dict bo'sh bo'lsa hech narsa qilmaymiz
     if not data:
-        return
+        return await get_page(page_id)
 
     set_clause = ", ".join([f"{key} = ?" for key in data.keys()])
-    values = list(data.values())
-    values.append(page_id)
+    where = "".join(f" AND {key} IS ?" for key in expected or {})
+    values = [*data.values(), page_id, *(expected or {}).values()]
 
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute(
-            f"UPDATE pages SET {set_clause} WHERE id = ?",
+    async with pool.write() as db:
+        rows = await db.execute_fetchall(
+            f"UPDATE pages SET {set_clause}, version = version + 1 WHERE id = ?{where} RETURNING *",
             values
         )
-        await db.commit()
+    if not rows:
+        return {}
+    page = _cache_written(rows)
+    _notify_page_change(page_id)
+    return page
 
-async def delete_page_content(page_id: str):
+@timed_db
+async def delete_page_content(page_id: str) -> dict:
     """Sahifa kontentini tozalash (o'chirish emas, null qilish)"""
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with pool.write() as db:
+        rows = await db.execute_fetchall(
+            "UPDATE pages SET audio = NULL, audio_stream = NULL, audio_peaks = NULL, "
+            "image = NULL, image_variants = NULL, image_placeholder = NULL, text = NULL, "
+            "version = version + 1 WHERE id = ? RETURNING *",
+            (page_id,)
+        )
+    page = _cache_written(rows)
+    _notify_page_change(page_id)
+    return page
+
+@timed_db
+async def get_qr_file_id(cache_key: str) -> str | None:
+    """Avval yuborilgan QR rasmning Telegram file_id'si"""
+    async with pool.read() as db:
+        async with db.execute(
+            "SELECT file_id FROM qr_files WHERE cache_key = ?", (cache_key,)
+        ) as cursor:
+            row = await cursor.fetchone()
+            return row[0] if row else None
+
+@timed_db
+async def save_qr_file_id(cache_key: str, page_url: str, file_id: str):
+    """QR rasm file_id'sini saqlash (URL yoki uslub o'zgarsa — kalit ham o'zgaradi)"""
+    async with pool.write() as db:
+        # Shu URL uchun eski uslubdagi yozuvlar endi kerak emas
+        await db.execute(
+            "DELETE FROM qr_files WHERE page_url = ? AND cache_key != ?",
+            (page_url, cache_key)
+        )
+        await db.execute(
+            "INSERT OR REPLACE INTO qr_files (cache_key, page_url, file_id) VALUES (?, ?, ?)",
+            (cache_key, page_url, file_id)
+        )
+
+@timed_db
+async def delete_qr_file_id(cache_key: str):
+    """Eskirgan file_id'ni o'chirish"""
+    async with pool.write() as db:
+        await db.execute("DELETE FROM qr_files WHERE cache_key = ?", (cache_key,))
+
+@timed_db
+async def add_batch_job(job_id: str, user_id: int, chat_id: int, message_id: int, items: str, total: int):
+    """Yangi ommaviy generatsiya vazifasi (items — JSON)"""
+    async with pool.write() as db:
+        await db.execute(
+            "INSERT INTO batch_jobs (id, user_id, chat_id, message_id, items, total) VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, user_id, chat_id, message_id, items, total)
+        )
+
+@timed_db
+async def get_batch_job(job_id: str) -> dict:
+    """Vazifani olish (topilmasa — bo'sh dict)"""
+    async with pool.read() as db:
+        async with db.execute("SELECT * FROM batch_jobs WHERE id = ?", (job_id,)) as cursor:
+            row = await cursor.fetchone()
+            return dict(row) if row else {}
+
+@timed_db
+async def update_batch_job(job_id: str, done: int | None = None, status: str | None = None):
+    """Vazifa holatini yangilash"""
+    data = {key: value for key, value in (("done", done), ("status", status)) if value is not None}
+    if not data:
+        return
+    set_clause = ", ".join([f"{key} = ?" for key in data.keys()])
+    async with pool.write() as db:
+        await db.execute(
+            f"UPDATE batch_jobs SET {set_clause} WHERE id = ?",
+            [*data.values(), job_id]
+        )
+
+@timed_db
+async def get_running_batch_jobs() -> list[dict]:
+    """Tugallanmagan vazifalar (qayta ishga tushganda davom ettirish uchun)"""
+    async with pool.read() as db:
+        async with db.execute(
+            "SELECT * FROM batch_jobs WHERE status = 'running' ORDER BY created_at"
+        ) as cursor:
+            return [dict(row) for row in await cursor.fetchall()]
+
+# ─── FSM holatlari ──────────────────────────────────────────
+@timed_db
+async def get_fsm(key: str) -> tuple[str | None, str | None]:
+    """(state, data JSON) — yozuv bo'lmasa (None, None)"""
+    async with pool.read() as db:
+        async with db.execute("SELECT state, data FROM fsm_states WHERE key = ?", (key,)) as cursor:
+            row = await cursor.fetchone()
+            return (row[0], row[1]) if row else (None, None)
+
+@timed_db
+async def set_fsm(key: str, column: str, value: str | None):
+    """state yoki data ustunini yozish; ikkalasi ham bo'sh bo'lsa — yozuv o'chiriladi"""
+    if column not in ("state", "data"):
+        raise ValueError(f"Noma'lum FSM ustuni: {column}")
+    async with pool.write() as db:
+        await db.execute(
+            f"INSERT INTO fsm_states (key, {column}) VALUES (?, ?) "
+            f"ON CONFLICT(key) DO UPDATE SET {column} = excluded.{column}",
+            (key, value)
+        )
+        await db.execute(
+            "DELETE FROM fsm_states WHERE key = ? AND state IS NULL AND data IS NULL", (key,)
+        )
+
+@timed_db
+async def delete_fsm(key: str):
+    """Holat va ma'lumotni bitta yozuvda tozalash (FSMContext.clear() ikki marta yozadi)"""
+    async with pool.write() as db:
+        await db.execute("DELETE FROM fsm_states WHERE key = ?", (key,))
+
+# ─── Ijara (lease) ──────────────────────────────────────────
+@timed_db
+async def acquire_lease(name: str, owner: str, ttl: float) -> bool:
+    """
+    Ijarani olish yoki uzaytirish. Boshqa jarayon ushlab turgan va muddati
+    o'tmagan bo'lsa — False. Jarayon o'lsa, ijara ttl soniyadan keyin bo'shaydi.
+    """
+    now = time.time()
+    async with pool.write() as db:
         await db.execute(
-            "UPDATE pages SET audio = NULL, image = NULL, text = NULL WHERE id = ?",
+            "INSERT INTO leases (name, owner, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+            "WHERE leases.owner = excluded.owner OR leases.expires_at < ?",
+            (name, owner, now + ttl, now)
+        )
+        async with db.execute("SELECT owner FROM leases WHERE name = ?", (name,)) as cursor:
+            row = await cursor.fetchone()
+    return row is not None and row[0] == owner
+
+@timed_db
+async def release_lease(name: str, owner: str):
+    """Ijarani bo'shatish (faqat egasi)"""
+    async with pool.write() as db:
+        await db.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
+
+# ─── Ko'rishlar statistikasi ────────────────────────────────
+@timed_db
+async def add_page_views(rows: list[tuple[str, str, str, str, int]]):
+    """(page_id, hour, source, device, views) qatorlarini qo'shish — bitta tranzaksiya"""
+    async with pool.write() as db:
+        await db.executemany(
+            "INSERT INTO page_views (page_id, hour, source, device, views) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(page_id, hour, source, device) DO UPDATE SET views = views + excluded.views",
+            rows
+        )
+
+@timed_db
+async def get_page_stats(page_id: str, since_hour: str) -> dict:
+    """Jami, since_hour dan beri va manba/qurilma bo'yicha ko'rishlar"""
+    async with pool.read() as db:
+        async with db.execute(
+            "SELECT COALESCE(SUM(views), 0), COALESCE(SUM(CASE WHEN hour >= ? THEN views END), 0) "
+            "FROM page_views WHERE page_id = ?",
+            (since_hour, page_id)
+        ) as cursor:
+            total, recent = await cursor.fetchone()
+        async with db.execute(
+            "SELECT source, SUM(views) FROM page_views WHERE page_id = ? GROUP BY source ORDER BY 2 DESC",
+            (page_id,)
+        ) as cursor:
+            sources = [tuple(row) for row in await cursor.fetchall()]
+        async with db.execute(
+            "SELECT device, SUM(views) FROM page_views WHERE page_id = ? GROUP BY device ORDER BY 2 DESC",
             (page_id,)
+        ) as cursor:
+            devices = [tuple(row) for row in await cursor.fetchall()]
+    return {"total": total, "recent": recent, "sources": sources, "devices": devices}
+
+# ─── Media fayllar (kontent bo'yicha) ───────────────────────
+@timed_db
+async def claim_media(file_unique_id: str) -> str | None:
+    """
+    Telegram fayli avval yuklangan bo'lsa — blob nomi. Havolasiz blob'ning
+    muddati yangilanadi: update_page ulguncha GC uni o'chirmaydi.
+    """
+    async with pool.write() as db:
+        rows = await db.execute_fetchall(
+            "UPDATE media_blobs SET unreferenced_at = CASE WHEN refs <= 0 THEN ? ELSE unreferenced_at END "
+            "WHERE filename = (SELECT filename FROM media_sources WHERE file_unique_id = ?) RETURNING filename",
+            (time.time(), file_unique_id)
+        )
+    return rows[0][0] if rows else None
+
+@timed_db
+async def register_media(filename: str, file_unique_id: str):
+    """Yuklangan blob va uning Telegram file_unique_id sini yozish"""
+    async with pool.write() as db:
+        await db.execute(
+            "INSERT INTO media_blobs (filename, unreferenced_at) VALUES (?, ?) "
+            "ON CONFLICT(filename) DO UPDATE SET unreferenced_at = "
+            "CASE WHEN refs <= 0 THEN excluded.unreferenced_at ELSE unreferenced_at END",
+            (filename, time.time())
         )
-        await db.commit()
+        await db.execute(
+            "INSERT OR REPLACE INTO media_sources (file_unique_id, filename) VALUES (?, ?)",
+            (file_unique_id, filename)
+        )
+
+@timed_db
+async def unreferenced_media(before: float, limit: int) -> list[str]:
+    """before dan beri havolasiz blob'lar (nomzodlar; o'chirish qarori — drop_media)"""
+    async with pool.read() as db:
+        rows = await db.execute_fetchall(
+            "SELECT filename FROM media_blobs WHERE refs <= 0 AND unreferenced_at < ? LIMIT ?",
+            (before, limit)
+        )
+    return [row[0] for row in rows]
+
+@asynccontextmanager
+async def drop_media(filename: str, before: float):
+    """
+    Blob'ni ro'yxatdan chiqarish — faqat hali ham havolasiz va muddati o'tgan bo'lsa.
+    Blok qiymati — fayllarni o'chirish mumkinmi. Blok davomida yozish tranzaksiyasi
+    ochiq (SQLite qulfi barcha jarayonlar uchun): fayllar shu blok ichida o'chiriladi,
+    boshqa jarayonning claim_media/register_media'si esa undan oldin yoki keyin
+    bajariladi — o'rtasida emas.
+    """
+    async with pool.write() as db:
+        await db.execute("BEGIN IMMEDIATE")
+        rows = await db.execute_fetchall(
+            "DELETE FROM media_blobs WHERE filename = ? AND refs <= 0 AND unreferenced_at < ? RETURNING filename",
+            (filename, before)
+        )
+        if rows:
+            await db.execute("DELETE FROM media_sources WHERE filename = ?", (filename,))
+        yield bool(rows)
+
+@asynccontextmanager
+async def drop_orphan_media(filename: str, blob_glob: str | None = None):
+    """
+    Yetim faylni o'chirish mumkinmi: na o'zi, na blob_glob'ga mos blob ro'yxatda yo'q.
+    drop_media kabi — qaror va o'chirish bitta yozish tranzaksiyasi ichida.
+    """
+    async with pool.write() as db:
+        await db.execute("BEGIN IMMEDIATE")
+        rows = await db.execute_fetchall(
+            "SELECT 1 FROM media_blobs WHERE filename = ? OR filename GLOB ? LIMIT 1",
+            (filename, blob_glob)
+        )
+        yield not rows
+
+@timed_db
+async def get_media_names() -> set[str]:
+    """Barcha ro'yxatdagi blob nomlari (yetim fayllarni topish uchun)"""
+    async with pool.read() as db:
+        return {row[0] for row in await db.execute_fetchall("SELECT filename FROM media_blobs")}
@@ -0,0 +1,48 @@
+"""
+🗂 aiogram FSM holatlari SQLite'da
+MemoryStorage faqat bitta jarayon xotirasida yashaydi — bir nechta bot jarayoni
+(yoki qayta ishga tushish) holatni yo'qotadi. Bu storage umumiy bazadan foydalanadi.
+
+O'qishlar keshlanmaydi: holatni boshqa jarayon yozgan bo'lishi mumkin, shuning
+uchun har bir update uchun bitta o'qish (get_state) — qabul qilingan narx.
+Tozalash clear() orqali bitta yozuv (FSMContext.clear() — ikkita).
+"""
+
+import json
+from typing import Any, Mapping
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, StateType, StorageKey
+
+from database import get_fsm, set_fsm, delete_fsm
+
+
+class SQLiteStorage(BaseStorage):
+    """fsm_states jadvali: kalit → (state, data JSON)"""
+
+    def __init__(self):
+        self.key_builder = DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        value = state.state if isinstance(state, State) else state
+        await set_fsm(self.key_builder.build(key), "state", value)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        state, _ = await get_fsm(self.key_builder.build(key))
+        return state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        value = json.dumps(dict(data), ensure_ascii=False) if data else None
+        await set_fsm(self.key_builder.build(key), "data", value)
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        _, data = await get_fsm(self.key_builder.build(key))
+        return json.loads(data) if data else {}
+
+    async def clear(self, key: StorageKey) -> None:
+        """Holat va ma'lumotni bitta tranzaksiyada o'chirish"""
+        await delete_fsm(self.key_builder.build(key))
+
+    async def close(self) -> None:
+        # Ulanishlar database.pool'niki — close_db() yopadi
+        pass
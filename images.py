@@ -0,0 +1,96 @@
+"""
+🖼 Landing sahifa suratlari uchun moslashuvchan variantlar
+Asl JPEG'dan bir nechta kichik WebP + juda kichik blur placeholder yasaladi.
+Telefon ekraniga mos o'lcham tanlanadi (srcset/sizes) — megabayt emas, kilobayt.
+"""
+
+import io
+import os
+import json
+import base64
+import logging
+import tempfile
+
+from PIL import Image, ImageOps
+
+from database import update_page
+from media import MEDIA_DIR, variant_filename
+from workers import pool, spawn
+
+logger = logging.getLogger(__name__)
+
+# Karta kengligi 420px — 3x ekranlar uchun ham yetadi
+VARIANT_WIDTHS = (320, 480, 720, 1080)
+WEBP_QUALITY = 75
+PLACEHOLDER_WIDTH = 16
+
+
+def _save_atomic(img: Image.Image, path, **params):
+    fd, tmp = tempfile.mkstemp(dir=MEDIA_DIR, prefix=".", suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            img.save(f, **params)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def build_image_variants(source: str) -> dict:
+    """Worker ichida: WebP variantlar va placeholder yasash"""
+    with Image.open(MEDIA_DIR / source) as original:
+        img = ImageOps.exif_transpose(original).convert("RGB")
+
+    # Asl suratdan kichik o'lchamlar + (katta bo'lmasa) asl kenglikning o'zi
+    widths = sorted({w for w in VARIANT_WIDTHS if w < img.width} | {min(img.width, VARIANT_WIDTHS[-1])})
+
+    variants = []
+    for width in widths:
+        resized = img if width == img.width else img.resize(
+            (width, max(1, round(img.height * width / img.width))), Image.Resampling.LANCZOS
+        )
+        filename = variant_filename(source, f"w{width}", "webp")
+        _save_atomic(resized, MEDIA_DIR / filename, format="WEBP", quality=WEBP_QUALITY, method=4)
+        variants.append({"w": width, "file": filename})
+
+    tiny = img.resize(
+        (PLACEHOLDER_WIDTH, max(1, round(img.height * PLACEHOLDER_WIDTH / img.width))),
+        Image.Resampling.BILINEAR,
+    )
+    buf = io.BytesIO()
+    tiny.save(buf, format="WEBP", quality=30)
+    placeholder = "data:image/webp;base64," + base64.b64encode(buf.getvalue()).decode()
+
+    return {"variants": variants, "placeholder": placeholder}
+
+
+def image_srcset(page: dict) -> str | None:
+    """page.html uchun srcset qiymati"""
+    if not page.get("image_variants"):
+        return None
+    return ", ".join(f"/media/{v['file']} {v['w']}w" for v in json.loads(page["image_variants"]))
+
+
+async def _process_image(page_id: str, source: str):
+    try:
+        result = await pool.run(build_image_variants, source)
+    except Exception as e:
+        logger.error(f"❌ Surat variantlari yasalmadi ({source}): {e}")
+        return
+
+    files = [v["file"] for v in result["variants"]]
+    # Compare-and-set: kesh (PAGE_ROW_TTL) boshqa jarayon yozuvini ko'rmasligi mumkin
+    page = await update_page(page_id, {
+        "image_variants": json.dumps(result["variants"]),
+        "image_placeholder": result["placeholder"],
+    }, expected={"image": source})
+    if not page:
+        # Bu orada surat almashtirilgan yoki o'chirilgan — variantlar blob'ga
+        # tegishli, kerak bo'lmasa media GC o'chiradi
+        return
+    logger.info(f"🖼 Surat variantlari tayyor: {page_id} ({len(files)} ta)")
+
+
+def schedule_image_processing(page_id: str, source: str):
+    """Variantlarni fonda yasash (foydalanuvchi javobini kutdirmaydi)"""
+    spawn(_process_image(page_id, source))
@@ -0,0 +1,64 @@
+"""
+👑 Lider tanlash — bir nechta bot jarayonidan faqat bittasi rejalashtirilgan
+ishlarni (backup, keep-alive) bajaradi. Ijara (lease) SQLite'da saqlanadi:
+lider uni muntazam uzaytiradi, jarayon o'lsa — ttl'dan keyin boshqasi oladi.
+"""
+
+import os
+import uuid
+import socket
+import logging
+from functools import wraps
+
+from database import acquire_lease, release_lease
+
+logger = logging.getLogger(__name__)
+
+LEADER_TTL = float(os.getenv("LEADER_TTL", "60"))
+
+# Shu jarayonning noyob nomi (qayta ishga tushganda yangisi)
+INSTANCE_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class LeaderLock:
+    """Nomlangan lider ijarasi; renew() ni ttl/3 da bir chaqirib turing"""
+
+    def __init__(self, name: str, ttl: float = LEADER_TTL):
+        self.name = name
+        self.ttl = ttl
+        self.is_leader = False
+
+    @property
+    def renew_interval(self) -> float:
+        return self.ttl / 3
+
+    async def renew(self) -> bool:
+        """Ijarani olish/uzaytirish; natija — hozir lidermizmi"""
+        try:
+            leader = await acquire_lease(self.name, INSTANCE_ID, self.ttl)
+        except Exception as e:
+            # Baza band — xavfsiz tomonga: ikki lider bo'lgandan ko'ra hech kim
+            logger.warning(f"⚠️ Lider ijarasi uzaytirilmadi: {e}")
+            leader = False
+
+        if leader and not self.is_leader:
+            logger.info(f"👑 {self.name}: bu jarayon lider ({INSTANCE_ID})")
+        elif self.is_leader and not leader:
+            logger.warning(f"👑 {self.name}: liderlik yo'qotildi ({INSTANCE_ID})")
+        self.is_leader = leader
+        return leader
+
+    async def release(self):
+        """To'xtashda ijarani bo'shatish — boshqa jarayon darhol oladi"""
+        if self.is_leader:
+            self.is_leader = False
+            await release_lease(self.name, INSTANCE_ID)
+
+    def only(self, fn):
+        """Dekorator: vazifa faqat liderda bajariladi"""
+        @wraps(fn)
+        async def wrapper(*args, **kwargs):
+            if not self.is_leader:
+                return None
+            return await fn(*args, **kwargs)
+        return wrapper
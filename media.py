@@ -0,0 +1,219 @@
+"""
+🎞 Media fayllar — yuklab olish, nomlash, saqlash va o'chirish
+Fayl nomida kontent hash'i bor: kontent o'zgarsa — URL ham o'zgaradi,
+shuning uchun brauzer/CDN faylni "immutable" sifatida keshlashi mumkin.
+
+Nom sahifaga emas, kontentga bog'liq ({kind}_{hash}.{ext}): bir xil surat yoki
+ovozli xabar bitta fayl bo'lib saqlanadi, qayta yuborilgan Telegram fayli
+(file_unique_id) umuman yuklanmaydi. Qaysi sahifalar ishlatayotgani SQLite'da
+hisoblanadi (media_blobs.refs); havolasiz fayllarni fonda sweep_media() o'chiradi.
+"""
+
+import os
+import re
+import time
+import uuid
+import asyncio
+import hashlib
+import logging
+from pathlib import Path
+
+import aiofiles
+import aiofiles.os
+
+from database import claim_media, register_media, unreferenced_media, drop_media, drop_orphan_media, get_media_names
+from metrics import counter, histogram, timed
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).parent
+MEDIA_DIR = BASE_DIR / "media"
+
+# Bot API 20 MB dan katta fayllarni baribir bermaydi
+MEDIA_MAX_MB = int(os.getenv("MEDIA_MAX_MB", "20"))
+MEDIA_CONCURRENCY = int(os.getenv("MEDIA_CONCURRENCY", "4"))
+CHUNK_SIZE = 64 * 1024
+# GC: havolasiz fayl shuncha soniyadan keyin o'chiriladi; bir tozalashda ko'pi bilan
+# MEDIA_GC_BATCH ta blob/yetim fayl, har o'chirish orasida MEDIA_GC_PAUSE pauza
+MEDIA_GC_GRACE = float(os.getenv("MEDIA_GC_GRACE", "3600"))
+MEDIA_GC_BATCH = int(os.getenv("MEDIA_GC_BATCH", "200"))
+MEDIA_GC_PAUSE = float(os.getenv("MEDIA_GC_PAUSE", "0.01"))
+
+# {kind}_{hash}.{ext} (eski fayllar: {page_id}_{kind}_{hash}.{ext})
+HASH_LENGTH = 16
+HASHED_NAME = re.compile(rf"^[\w-]+_[0-9a-f]{{{HASH_LENGTH}}}\.[a-z0-9]+$")
+
+MEDIA_DIR.mkdir(exist_ok=True)
+
+_download_slots = asyncio.Semaphore(MEDIA_CONCURRENCY)
+
+download_seconds = histogram("media_download_seconds", "Telegram'dan media yuklash (navbatsiz)", ("kind",))
+download_bytes = counter("media_download_bytes_total", "Yuklab olingan media hajmi", ("kind",))
+dedup_total = counter("media_dedup_total", "Qayta yuklanmagan (avval saqlangan) media", ("kind",))
+gc_bytes = counter("media_gc_bytes_total", "GC bo'shatgan joy")
+
+
+class MediaTooLarge(ValueError):
+    """Fayl MEDIA_MAX_MB dan katta"""
+
+
+def media_filename(kind: str, digest: str, ext: str) -> str:
+    """Kontent hash'li fayl nomi (bir xil kontent — bir xil nom)"""
+    return f"{kind}_{digest[:HASH_LENGTH]}.{ext}"
+
+
+def variant_filename(source: str, label: str, ext: str) -> str:
+    """Manba fayldan hosil bo'lgan variant nomi (hash manbaniki bilan bir xil)"""
+    stem = source.rsplit(".", 1)[0]
+    base, digest = stem.rsplit("_", 1)
+    return f"{base}-{label}_{digest}.{ext}"
+
+
+def blob_glob(key: tuple[str, str]) -> str:
+    """Blob kalitidagi manba fayl nomi uchun GLOB (kengaytma noma'lum)"""
+    return f"{key[0]}_{key[1]}.*"
+
+
+def blob_key(filename: str) -> tuple[str, str] | None:
+    """Fayl qaysi blob'ga tegishli: manba ham, undan hosil bo'lgan variantlar ham bir xil kalit"""
+    if not HASHED_NAME.match(filename):
+        return None
+    stem, digest = filename.rsplit(".", 1)[0].rsplit("_", 1)
+    return stem.split("-", 1)[0], digest
+
+
+def is_collectable(filename: str) -> bool:
+    """GC faqat o'zi yaratadigan fayllarni o'chiradi: hash'li nomlar va vaqtinchalik .part'lar"""
+    return bool(HASHED_NAME.match(filename)) or (filename.startswith(".") and ".part" in filename)
+
+
+def is_immutable(filename: str) -> bool:
+    """Nomida hash bor fayl hech qachon o'zgarmaydi"""
+    return bool(HASHED_NAME.match(filename))
+
+
+def _max_bytes() -> int:
+    return MEDIA_MAX_MB * 1024 * 1024
+
+
+async def ingest(bot, file_id: str, file_unique_id: str, kind: str, ext: str, file_size: int | None = None) -> str:
+    """
+    Telegram faylini saqlash. Shu file_unique_id avval yuklangan bo'lsa — mavjud
+    blob qaytadi. Aks holda vaqtinchalik faylga bo'laklab yoziladi, fsync qilinadi
+    va atomar rename bilan joyiga qo'yiladi (landing sahifa hech qachon yarim
+    yozilgan faylni ko'rmaydi). Bir xil kontent bitta faylga tushadi.
+    """
+    known = await claim_media(file_unique_id)
+    if known and await aiofiles.os.path.exists(MEDIA_DIR / known):
+        dedup_total.inc(kind=kind)
+        return known
+
+    if file_size and file_size > _max_bytes():
+        raise MediaTooLarge(f"{file_size} bayt")
+
+    # Vaqtinchalik nom har safar yangi — bir vaqtdagi yuklashlar to'qnashmaydi
+    tmp = MEDIA_DIR / f".{kind}_{uuid.uuid4().hex[:8]}.part"
+    async with _download_slots:
+        try:
+            with timed(download_seconds, span=f"download_{kind}", kind=kind):
+                file = await bot.get_file(file_id)
+                if file.file_size and file.file_size > _max_bytes():
+                    raise MediaTooLarge(f"{file.file_size} bayt")
+
+                url = bot.session.api.file_url(bot.token, file.file_path)
+                digest = hashlib.sha256()
+                size = 0
+                async with aiofiles.open(tmp, "wb") as f:
+                    async for chunk in bot.session.stream_content(url=url, chunk_size=CHUNK_SIZE):
+                        size += len(chunk)
+                        if size > _max_bytes():
+                            raise MediaTooLarge(f"{size}+ bayt")
+                        digest.update(chunk)
+                        await f.write(chunk)
+                    await f.flush()
+                    await asyncio.to_thread(os.fsync, f.fileno())
+
+                filename = media_filename(kind, digest.hexdigest(), ext)
+                # Avval ro'yxatga, keyin diskka: GC (istalgan jarayonda) o'chirishni
+                # yangi yozuvdan oldin tugatadi yoki yozuvni ko'rib faylni qoldiradi
+                await register_media(filename, file_unique_id)
+                await aiofiles.os.replace(tmp, MEDIA_DIR / filename)
+            download_bytes.inc(size, kind=kind)
+            return filename
+        except BaseException:
+            await _remove(tmp.name)
+            raise
+
+
+async def _remove(filename: str) -> int | None:
+    """Faylni o'chirish; natija — bo'shagan baytlar (o'chirilmagan bo'lsa None)"""
+    path = MEDIA_DIR / filename
+    try:
+        size = (await aiofiles.os.stat(path)).st_size
+        await aiofiles.os.remove(path)
+        return size
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        logger.warning(f"⚠️ Media o'chirishda xato ({filename}): {e}")
+        return None
+
+
+def _scan_media() -> list[tuple[str, float]]:
+    """MEDIA_DIR dagi fayllar va ularning mtime (thread'da)"""
+    with os.scandir(MEDIA_DIR) as entries:
+        return [(entry.name, entry.stat().st_mtime) for entry in entries if entry.is_file()]
+
+
+async def sweep_media() -> tuple[int, int]:
+    """
+    Havolasiz media'ni tozalash: (fayllar, baytlar).
+    1) refs 0 ga tushganiga MEDIA_GC_GRACE bo'lgan blob'lar va ularning variantlari;
+    2) hech bir blob'ga tegishli bo'lmagan eski/yetim fayllar (yiqilishdan qolgan
+       .part, o'chirilmay qolgan eski nomli fayllar). Boshqa fayllarga
+       (.gitkeep va h.k.) tegilmaydi.
+    O'chirishlar orasida pauza — disk va event loop band bo'lib qolmaydi.
+    """
+    cutoff = time.time() - MEDIA_GC_GRACE
+    files = await asyncio.to_thread(_scan_media)
+    removed = freed = 0
+
+    async def remove_all(names: list[str]):
+        nonlocal removed, freed
+        for name in names:
+            size = await _remove(name)
+            if size is not None:
+                removed += 1
+                freed += size
+
+    # Qaror bazada, har bir blob uchun alohida: o'chirish yozish tranzaksiyasi ichida,
+    # shuning uchun boshqa jarayon shu kontentni qayta yuklasa ham fayli o'chib ketmaydi
+    blobs = set(await unreferenced_media(cutoff, MEDIA_GC_BATCH))
+    doomed = set()
+    for blob in blobs:
+        key = blob_key(blob)
+        async with drop_media(blob, cutoff) as allowed:
+            if allowed:
+                doomed.add(key)
+                await remove_all([name for name, _ in files if name == blob or (key and blob_key(name) == key)])
+        await asyncio.sleep(MEDIA_GC_PAUSE)
+
+    # Yetimlar: ro'yxatdagi hech bir blob'ga tegishli emas va yetarlicha eski
+    known = await get_media_names()
+    claimed = ({blob_key(name) for name in known} | doomed) - {None}
+    orphans = [
+        name for name, mtime in files
+        if mtime < cutoff and is_collectable(name)
+        and name not in known and name not in blobs and blob_key(name) not in claimed
+    ]
+    for name in orphans[:MEDIA_GC_BATCH]:
+        key = blob_key(name)
+        async with drop_orphan_media(name, blob_glob(key) if key else None) as allowed:
+            if allowed:
+                await remove_all([name])
+        await asyncio.sleep(MEDIA_GC_PAUSE)
+
+    gc_bytes.inc(freed)
+    if removed:
+        logger.info(f"🧹 Media GC: {removed} ta fayl, {freed / 1024 / 1024:.1f} MB bo'shatildi")
+    return removed, freed
@@ -0,0 +1,204 @@
+"""
+📈 Metrikalar (Prometheus text format) va so'rov ichidagi tracing span'lar
+Tashqi kutubxonasiz: hisoblagich, histogram va kesh statistikasi /metrics da.
+Har bir jarayon o'z metrikalarini beradi (web.py bir nechta worker bo'lsa — har biri alohida).
+
+Tracing: X-Trace: 1 sarlavhasi (yoki TRACE_SAMPLE ulushi) bilan kelgan so'rovda
+timed() bloklari span sifatida yig'iladi va Server-Timing sarlavhasida qaytadi.
+"""
+
+import os
+import time
+import random
+import threading
+import contextvars
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+
+TRACE_SAMPLE = float(os.getenv("TRACE_SAMPLE", "0"))
+
+# Soniyalarda: 0.5 ms .. 10 s
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class Counter:
+    """O'sib boruvchi hisoblagich"""
+
+    def __init__(self, name: str, doc: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.doc = doc
+        self.label_names = labels
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels[name] for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.label_names, key)} {value:g}")
+        return lines
+
+
+class Histogram:
+    """Vaqt taqsimoti (kumulyativ bucket'lar + sum + count)"""
+
+    def __init__(self, name: str, doc: str, labels: tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.doc = doc
+        self.label_names = labels
+        self.buckets = tuple(buckets)
+        # label qiymatlari → [bucket'lar bo'yicha sonlar..., +Inf, sum]
+        self._values: dict[tuple, list[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, **labels):
+        key = tuple(labels[name] for name in self.label_names)
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += seconds
+
+    def collect(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._values.items())
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), series[:-1]):
+                cumulative += count
+                le = _labels((*self.label_names, "le"), (*key, bound if bound == "+Inf" else f"{bound:g}"))
+                lines.append(f"{self.name}_bucket{le} {cumulative:g}")
+            labels = _labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{labels} {cumulative:g}")
+        return lines
+
+
+_metrics: list = []
+_cache_sources: dict[str, object] = {}
+
+
+def counter(name: str, doc: str, labels: tuple[str, ...] = ()) -> Counter:
+    metric = Counter(name, doc, labels)
+    _metrics.append(metric)
+    return metric
+
+
+def histogram(name: str, doc: str, labels: tuple[str, ...] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+    metric = Histogram(name, doc, labels, buckets)
+    _metrics.append(metric)
+    return metric
+
+
+def register_cache(name: str, cache):
+    """hits/misses/size atributlari bor keshni /metrics ga qo'shish (LRUCache)"""
+    _cache_sources[name] = cache
+
+
+def _collect_caches() -> list[str]:
+    if not _cache_sources:
+        return []
+    lines = []
+    for metric, doc, kind in (
+        ("cache_hits_total", "Kesh topilgan so'rovlar", "counter"),
+        ("cache_misses_total", "Kesh topilmagan so'rovlar", "counter"),
+        ("cache_bytes", "Keshdagi ma'lumot hajmi", "gauge"),
+        ("cache_hit_ratio", "hits / (hits + misses)", "gauge"),
+    ):
+        lines += [f"# HELP {metric} {doc}", f"# TYPE {metric} {kind}"]
+        for name, cache in sorted(_cache_sources.items()):
+            total = cache.hits + cache.misses
+            value = {
+                "cache_hits_total": cache.hits,
+                "cache_misses_total": cache.misses,
+                "cache_bytes": cache.size,
+                "cache_hit_ratio": cache.hits / total if total else 0,
+            }[metric]
+            lines.append(f'{metric}{{cache="{name}"}} {value:g}')
+    return lines
+
+
+def render_metrics() -> str:
+    """Barcha metrikalar — Prometheus text exposition format"""
+    lines = []
+    for metric in _metrics:
+        lines += metric.collect()
+    lines += _collect_caches()
+    return "\n".join(lines) + "\n"
+
+
+# ─── Tracing ────────────────────────────────────────────────
+_spans: contextvars.ContextVar[list | None] = contextvars.ContextVar("spans", default=None)
+
+
+def should_trace(header: str | None) -> bool:
+    """So'rovni kuzatish kerakmi (X-Trace sarlavhasi yoki tasodifiy ulush)"""
+    if header and header not in ("0", "false"):
+        return True
+    return TRACE_SAMPLE > 0 and random.random() < TRACE_SAMPLE
+
+
+def start_trace() -> contextvars.Token:
+    return _spans.set([])
+
+
+def current_spans() -> list[tuple[str, float]]:
+    """Hozirgacha yig'ilgan span'lar (kuzatilmayotgan so'rovda — bo'sh)"""
+    return list(_spans.get() or [])
+
+
+def finish_trace(token: contextvars.Token) -> list[tuple[str, float]]:
+    spans = _spans.get() or []
+    _spans.reset(token)
+    return spans
+
+
+def server_timing(spans: list[tuple[str, float]]) -> str:
+    """Span'lar → Server-Timing sarlavhasi (brauzer DevTools'da ko'rinadi)"""
+    return ", ".join(f"{name.replace(' ', '_')};dur={seconds * 1000:.2f}" for name, seconds in spans)
+
+
+@contextmanager
+def timed(metric: Histogram, span: str | None = None, **labels):
+    """Blok vaqtini histogramga yozish (+ kuzatilayotgan so'rov bo'lsa — span)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        metric.observe(elapsed, **labels)
+        spans = _spans.get()
+        if spans is not None:
+            spans.append((span or metric.name, elapsed))
+
+
+def timed_async(metric: Histogram, label: str, value=None):
+    """Async funksiya dekoratori: label=funksiya nomi (yoki value)"""
+    def decorator(fn):
+        name = value or fn.__name__
+
+        @wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with timed(metric, span=name, **{label: name}):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,212 @@
+"""
+📦 Ommaviy QR generatsiya
+- HTTP: ZIP arxiv oqim (stream) ko'rinishida — xotirada to'liq saqlanmaydi,
+  har bir fayl tayyor bo'lishi bilan uning baytlari tashqariga beriladi
+- Bot: fayllar papkaga yoziladi — jarayon uzilsa, qolgan joyidan davom etadi
+"""
+
+import io
+import os
+import re
+import csv
+import asyncio
+import logging
+import zipfile
+import tempfile
+from pathlib import Path
+from typing import AsyncIterator
+
+from qrgen import render_qr, resolve_style, qr_side, QR_MAX_SIDE
+from workers import WORKER_COUNT
+
+logger = logging.getLogger(__name__)
+
+QR_BATCH_MAX = int(os.getenv("QR_BATCH_MAX", "10000"))
+# QR (versiya 40, L) sig'imi — bundan uzun payload baribir sig'maydi
+MAX_PAYLOAD = 2953
+BATCH_CONCURRENCY = WORKER_COUNT * 2
+
+SAFE_NAME = re.compile(r"[^\w.-]+")
+
+
+class BatchError(ValueError):
+    """Noto'g'ri ommaviy so'rov (bo'sh, juda katta va h.k.)"""
+
+
+class _ZipSink(io.RawIOBase):
+    """zipfile yozadigan "fayl" — baytlar tashqariga olib ketilguncha shu yerda"""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def parse_csv(text: str) -> list[tuple[str | None, str]]:
+    """CSV: 1-ustun — payload, 2-ustun (ixtiyoriy) — fayl nomi"""
+    items = []
+    for row in csv.reader(io.StringIO(text)):
+        if not row or not row[0].strip():
+            continue
+        name = row[1].strip() if len(row) > 1 and row[1].strip() else None
+        items.append((name, row[0].strip()))
+    return items
+
+
+def parse_json(body) -> list[tuple[str | None, str]]:
+    """JSON: ["payload", ...] yoki [{"data": "...", "name": "..."}, ...] (yoki {"items": [...]})"""
+    if isinstance(body, dict):
+        body = body.get("items", [])
+    if not isinstance(body, list):
+        raise BatchError("Payloadlar ro'yxati kutilgan")
+    items = []
+    for i, item in enumerate(body, start=1):
+        name = None
+        if isinstance(item, dict):
+            name, item = item.get("name"), item.get("data")
+            if name is not None and not isinstance(name, str):
+                raise BatchError(f"{i}-element: name matn bo'lishi kerak")
+        # null, son, ro'yxat "None"/"[1, 2]" kabi QR bo'lib ketmasin
+        if not isinstance(item, str) or not item.strip():
+            raise BatchError(f"{i}-element: payload bo'sh bo'lmagan matn bo'lishi kerak")
+        items.append((name, item))
+    return items
+
+
+def normalize_items(items: list[tuple[str | None, str]], ext: str = "png") -> list[tuple[str, str]]:
+    """Bo'sh emasligini, hajmini tekshirish va takrorlanmas fayl nomlarini berish"""
+    if not items:
+        raise BatchError("Payloadlar ro'yxati bo'sh")
+    if len(items) > QR_BATCH_MAX:
+        raise BatchError(f"Juda ko'p payload: {len(items)} > {QR_BATCH_MAX}")
+
+    width = len(str(len(items)))
+    used = set()
+    result = []
+    for i, (name, data) in enumerate(items, start=1):
+        if len(data.encode("utf-8")) > MAX_PAYLOAD:
+            raise BatchError(f"{i}-payload juda uzun")
+        stem = SAFE_NAME.sub("_", name).strip("._")[:80] if name else ""
+        stem = stem or f"qr_{i:0{width}d}"
+        filename = f"{stem}.{ext}"
+        if filename in used:
+            filename = f"{stem}_{i}.{ext}"
+        used.add(filename)
+        result.append((filename, data))
+    return result
+
+
+def check_side(items: list[tuple[str, str]], **style):
+    """
+    Eng uzun payload rasmi QR_MAX_SIDE dan oshmasin — vazifa boshlanishidan oldin,
+    bitta hisob bilan. Sig'maydigan payload (u baribir errors.txt ga tushadi)
+    o'rniga eng katta versiya (40) olinadi.
+    """
+    data = max((data for _, data in items), key=lambda data: len(data.encode("utf-8")))
+    try:
+        side = qr_side(data, **style)
+    except ValueError:
+        resolved = resolve_style(**style)
+        side = (40 * 4 + 17 + 2 * resolved["border"]) * resolved["box_size"]
+    if side > QR_MAX_SIDE:
+        raise BatchError(f"Rasm {side} px — ko'pi bilan {QR_MAX_SIDE} px (size'ni kamaytiring)")
+
+
+async def iter_qr_zip(items: list[tuple[str, str]], progress=None, **style) -> AsyncIterator[bytes]:
+    """
+    QR kodlarni parallel chizib, ZIP bo'laklarini ketma-ket qaytarish.
+    Bir vaqtda faqat BATCH_CONCURRENCY ta rasm xotirada bo'ladi.
+    progress(done, total) — har bir fayldan keyin chaqiriladi (ixtiyoriy).
+    """
+    sink = _ZipSink()
+    errors = []
+    pending: dict[int, asyncio.Task] = {}
+    next_index = 0
+
+    def schedule():
+        nonlocal next_index
+        while next_index < len(items) and len(pending) < BATCH_CONCURRENCY:
+            _, data = items[next_index]
+            pending[next_index] = asyncio.ensure_future(render_qr(data, cache=False, **style))
+            next_index += 1
+
+    try:
+        # PNG allaqachon siqilgan, SVG/matritsa esa kichik — ZIP_STORED yetarli va tez
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as archive:
+            for i, (filename, _) in enumerate(items):
+                schedule()
+                try:
+                    image = await pending.pop(i)
+                except Exception as e:
+                    errors.append(f"{filename}: {e}")
+                else:
+                    archive.writestr(filename, image)
+                if progress:
+                    await progress(i + 1, len(items))
+                chunk = sink.drain()
+                if chunk:
+                    yield chunk
+
+            if errors:
+                archive.writestr("errors.txt", "\n".join(errors) + "\n")
+        yield sink.drain()
+    finally:
+        for task in pending.values():
+            task.cancel()
+
+
+def _write_atomic(path: Path, data: bytes):
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".part")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+async def render_to_dir(items: list[tuple[str, str]], directory: Path, progress=None, **style) -> list[str]:
+    """
+    Har bir QR kodni papkaga alohida fayl qilib yozish.
+    Oldin yozilgan fayllar o'tkazib yuboriladi — jarayon uzilsa, davom ettirish mumkin.
+    Xato bergan qatorlar ro'yxati qaytariladi.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    existing = set(os.listdir(directory))
+    slots = asyncio.Semaphore(BATCH_CONCURRENCY)
+    errors = []
+    done = 0
+
+    async def one(filename: str, data: str):
+        nonlocal done
+        if filename not in existing:
+            async with slots:
+                try:
+                    image = await render_qr(data, cache=False, **style)
+                    await asyncio.to_thread(_write_atomic, directory / filename, image)
+                except Exception as e:
+                    errors.append(f"{filename}: {e}")
+        done += 1
+        if progress:
+            await progress(done, len(items))
+
+    await asyncio.gather(*(one(filename, data) for filename, data in items))
+    return errors
+
+
+def zip_dir(directory: Path, items: list[tuple[str, str]], errors: list[str], zip_path: Path):
+    """render_to_dir natijasini ZIP faylga yig'ish (thread'da chaqiriladi)"""
+    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_STORED) as archive:
+        for filename, _ in items:
+            path = directory / filename
+            if path.exists():
+                archive.write(path, filename)
+        if errors:
+            archive.writestr("errors.txt", "\n".join(errors) + "\n")
@@ -0,0 +1,133 @@
+"""
+🧮 QR matritsani NumPy bilan rasmga aylantirish
+StyledPilImage + RoundedModuleDrawer + SolidFillColorMask natijasi bilan
+piksel-ma-piksel bir xil, lekin modullarni bittalab chizmaydi:
+har bir qo'shnilar holati uchun tayyor "tile" olinadi va butun rasm
+bitta indekslash amali bilan yig'iladi.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+# qrcode kutubxonasidagi bilan bir xil bo'lishi shart
+ANTIALIASING_FACTOR = 4
+PAINT_COLOR = (0, 0, 0)
+
+# Tile indekslari: 0 — fon, 1 — to'liq kvadrat (ko'zlar), 2..17 — yumaloq modullar
+TILE_BACK = 0
+TILE_SQUARE = 1
+TILE_ROUNDED = 2
+
+# Qo'shni bitlari (yumaloq tile indeksi = TILE_ROUNDED + bitlar yig'indisi)
+N, E, S, W = 1, 2, 4, 8
+
+
+def _round_corner(corner: int, back_color: tuple) -> Image.Image:
+    """NW burchak: RoundedModuleDrawer.setup_corners bilan bir xil"""
+    fake_width = corner * ANTIALIASING_FACTOR
+    radius = fake_width
+    base = Image.new("RGB", (fake_width, fake_width), back_color)
+    draw = ImageDraw.Draw(base)
+    draw.ellipse((0, 0, radius * 2, radius * 2), fill=PAINT_COLOR)
+    draw.rectangle((radius, 0, fake_width, fake_width), fill=PAINT_COLOR)
+    draw.rectangle((0, radius, fake_width, fake_width), fill=PAINT_COLOR)
+    return base.resize((corner, corner), Image.Resampling.LANCZOS)
+
+
+def _apply_color(tile: np.ndarray, front_color: tuple, back_color: tuple) -> np.ndarray:
+    """SolidFillColorMask.apply_mask mantiqi (antialiasing gradientini saqlaydi)"""
+    if back_color == (255, 255, 255) and front_color == (0, 0, 0):
+        return tile
+
+    out = tile.copy()
+    flat = out.reshape(-1, 3)
+    cache = {}
+    for i, pixel in enumerate(map(tuple, flat.tolist())):
+        if pixel == back_color:
+            continue
+        if pixel not in cache:
+            normed = [
+                (ci - c1) / (c2 - c1)
+                for c1, c2, ci in zip(back_color, PAINT_COLOR, pixel)
+                if c2 != c1
+            ]
+            if normed:
+                norm = sum(normed) / len(normed)
+                cache[pixel] = tuple(
+                    int(front_color[k] * norm + back_color[k] * (1 - norm)) for k in range(3)
+                )
+            else:
+                cache[pixel] = back_color
+        flat[i] = cache[pixel]
+    return out
+
+
+@lru_cache(maxsize=32)
+def build_tiles(box_size: int, front_color: tuple, back_color: tuple) -> np.ndarray:
+    """Barcha tile variantlari: (18, box_size, box_size, 3) uint8"""
+    corner = box_size // 2
+    nw = _round_corner(corner, back_color)
+    rounded = {
+        "nw": nw,
+        "ne": nw.transpose(Image.Transpose.FLIP_LEFT_RIGHT),
+        "se": nw.transpose(Image.Transpose.ROTATE_180),
+        "sw": nw.transpose(Image.Transpose.FLIP_TOP_BOTTOM),
+    }
+    square = Image.new("RGB", (corner, corner), PAINT_COLOR)
+
+    tiles = []
+    tiles.append(Image.new("RGB", (box_size, box_size), back_color))
+
+    full = Image.new("RGB", (box_size, box_size), back_color)
+    ImageDraw.Draw(full).rectangle((0, 0, box_size - 1, box_size - 1), fill=PAINT_COLOR)
+    tiles.append(full)
+
+    for bits in range(16):
+        n, e, s, w = bits & N, bits & E, bits & S, bits & W
+        tile = Image.new("RGB", (box_size, box_size), back_color)
+        tile.paste(rounded["nw"] if not (w or n) else square, (0, 0))
+        tile.paste(rounded["ne"] if not (n or e) else square, (corner, 0))
+        tile.paste(rounded["se"] if not (e or s) else square, (corner, corner))
+        tile.paste(rounded["sw"] if not (s or w) else square, (0, corner))
+        tiles.append(tile)
+
+    stack = np.stack([np.asarray(t, dtype=np.uint8) for t in tiles])
+    stack = _apply_color(stack, tuple(front_color), tuple(back_color))
+    stack.setflags(write=False)
+    return stack
+
+
+def tile_indices(matrix, border: int) -> np.ndarray:
+    """Har bir modul uchun tile indeksi (chegarasi bilan birga)"""
+    m = np.asarray(matrix, dtype=bool)
+    size = m.shape[0] - border * 2
+
+    inner = m[border:border + size, border:border + size]
+    padded = np.pad(inner, 1)
+    bits = (
+        padded[:-2, 1:-1] * N
+        + padded[1:-1, 2:] * E
+        + padded[2:, 1:-1] * S
+        + padded[1:-1, :-2] * W
+    )
+    idx = np.where(inner, TILE_ROUNDED + bits, TILE_BACK)
+
+    # Ko'zlar (finder pattern) StyledPilImage'da oddiy kvadrat bilan chiziladi
+    eye = np.zeros_like(inner)
+    eye[:7, :7] = True
+    eye[:7, size - 7:] = True
+    eye[size - 7:, :7] = True
+    idx[eye & inner] = TILE_SQUARE
+
+    return np.pad(idx, border, constant_values=TILE_BACK)
+
+
+def rasterize(matrix, border: int, box_size: int, front_color: tuple, back_color: tuple) -> Image.Image:
+    """qr.get_matrix() → yumaloq modulli RGB rasm"""
+    tiles = build_tiles(box_size, tuple(front_color), tuple(back_color))
+    idx = tile_indices(matrix, border)
+    rows, cols = idx.shape
+    pixels = tiles[idx].transpose(0, 2, 1, 3, 4).reshape(rows * box_size, cols * box_size, 3)
+    return Image.fromarray(pixels, "RGB")
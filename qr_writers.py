@@ -0,0 +1,130 @@
+"""
+🖨 QR matritsani turli formatlarga yozish
+Har bir format — matritsa + uslub → bayt. Keragini tanlang:
+- png          — chiroyli rangli PNG (yumaloq modullar + yozuv), bot uchun
+- png-palette  — 1-bit / 2 rangli palitra PNG, juda kichik va tez
+- svg          — vektor; qatordagi ketma-ket modullar bitta path'ga birlashtiriladi
+- matrix       — xom modul matritsasi ("0"/"1" qatorlari)
+"""
+
+import io
+import os
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from qr_raster import rasterize
+
+CAPTION_COLOR = (100, 116, 139)
+# Yozuv shrifti (TTF yo'li); topilmasa arial.ttf, u ham bo'lmasa Pillow'ning standarti
+CAPTION_FONT = os.getenv("CAPTION_FONT")
+CAPTION_FONT_SIZE = 18
+# QR ostidagi bo'sh joy va yozuv balandligi
+PAD = 40
+CAPTION_HEIGHT = 50
+
+
+@lru_cache(maxsize=1)
+def caption_font() -> ImageFont.ImageFont | ImageFont.FreeTypeFont:
+    """Shriftni bir marta yuklash (har bir jarayonda) — truetype qidiruvi qimmat"""
+    for name in (CAPTION_FONT, "arial.ttf"):
+        if not name:
+            continue
+        try:
+            return ImageFont.truetype(name, CAPTION_FONT_SIZE)
+        except OSError:
+            pass
+    return ImageFont.load_default()
+
+
+@lru_cache(maxsize=32)
+def caption_strip(width: int, caption: str, back_color: tuple) -> Image.Image:
+    """QR ostidagi yozuvli chiziq (faqat o'qiladi — har safar qayta chizilmaydi)"""
+    strip = Image.new("RGB", (width, CAPTION_HEIGHT + PAD), back_color)
+    if caption:
+        draw = ImageDraw.Draw(strip)
+        font = caption_font()
+        bbox = draw.textbbox((0, 0), caption, font=font)
+        tw = bbox[2] - bbox[0]
+        draw.text(((width - tw) // 2, 0), caption, fill=CAPTION_COLOR, font=font)
+    return strip
+
+
+def write_png(matrix, style: dict) -> bytes:
+    """Yumaloq modulli RGB PNG, pastida yozuv bilan"""
+    # StyledPilImage + RoundedModuleDrawer bilan bir xil natija, lekin tezroq
+    img = rasterize(
+        matrix,
+        border=style["border"],
+        box_size=style["box_size"],
+        front_color=style["front_color"],
+        back_color=style["back_color"],
+    )
+
+    qr_w, qr_h = img.size
+    canvas = Image.new("RGB", (qr_w + PAD * 2, qr_h + PAD + CAPTION_HEIGHT + PAD), style["back_color"])
+    canvas.paste(img, (PAD, PAD // 2))
+    if style["caption"]:
+        canvas.paste(caption_strip(canvas.width, style["caption"], style["back_color"]), (0, qr_h + PAD))
+
+    buf = io.BytesIO()
+    canvas.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def write_palette_png(matrix, style: dict) -> bytes:
+    """Kvadrat modulli 1-bit PNG (ikki rangli palitra)"""
+    box = style["box_size"]
+    modules = np.asarray(matrix, dtype=np.uint8)
+    pixels = np.repeat(np.repeat(modules, box, axis=0), box, axis=1)
+
+    img = Image.fromarray(pixels, "P")
+    img.putpalette([*style["back_color"], *style["front_color"]])
+
+    buf = io.BytesIO()
+    img.save(buf, format="PNG", bits=1, optimize=True)
+    return buf.getvalue()
+
+
+def _hex(color: tuple) -> str:
+    return "#" + "".join(f"{c:02x}" for c in color[:3])
+
+
+def write_svg(matrix, style: dict) -> bytes:
+    """Vektor SVG — har bir qatordagi uzluksiz modullar bitta to'rtburchak"""
+    modules = np.asarray(matrix, dtype=bool)
+    size = modules.shape[0]
+    pixels = size * style["box_size"]
+
+    parts = []
+    for y, row in enumerate(modules):
+        # Qatordagi "yoqilgan" bo'laklar boshlanishi va oxirini topish
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], row.view(np.int8), [0]))))
+        for start, end in zip(edges[::2], edges[1::2]):
+            parts.append(f"M{start} {y}h{end - start}v1h-{end - start}z")
+
+    svg = (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {size} {size}" '
+        f'width="{pixels}" height="{pixels}" shape-rendering="crispEdges">'
+        f'<rect width="{size}" height="{size}" fill="{_hex(style["back_color"])}"/>'
+        f'<path fill="{_hex(style["front_color"])}" d="{"".join(parts)}"/>'
+        f"</svg>"
+    )
+    return svg.encode("ascii")
+
+
+def write_matrix(matrix, style: dict) -> bytes:
+    """Xom matritsa: har bir qator — "0"/"1" satri (chegara bilan)"""
+    return "".join(
+        "".join("1" if cell else "0" for cell in row) + "\n" for row in matrix
+    ).encode("ascii")
+
+
+# format → (yozuvchi, MIME turi, fayl kengaytmasi)
+WRITERS = {
+    "png": (write_png, "image/png", "png"),
+    "png-palette": (write_palette_png, "image/png", "png"),
+    "svg": (write_svg, "image/svg+xml", "svg"),
+    "matrix": (write_matrix, "text/plain", "txt"),
+}
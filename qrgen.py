@@ -0,0 +1,166 @@
+"""
+🔳 QR kod rasmlarini yaratish
+Natijalar ikki qavatli keshda saqlanadi: xotira (LRU) + disk
+Chiqish formatlari — qr_writers.py
+"""
+
+import os
+import time
+import asyncio
+import hashlib
+import logging
+from pathlib import Path
+
+import qrcode
+
+from cache import LRUCache, DiskCache
+from metrics import histogram, register_cache, timed
+from qr_writers import WRITERS
+from workers import pool
+
+logger = logging.getLogger(__name__)
+
+# ─── Sozlamalar ─────────────────────────────────────────────
+BASE_DIR = Path(__file__).parent
+CACHE_DIR = BASE_DIR / "cache"
+QR_CACHE_MB = int(os.getenv("QR_CACHE_MB", "32"))
+# Ommaviy API: rasm tomoni (piksel) shundan oshmasin
+QR_MAX_SIDE = int(os.getenv("QR_MAX_SIDE", "2400"))
+
+ERROR_LEVELS = {
+    "L": qrcode.constants.ERROR_CORRECT_L,
+    "M": qrcode.constants.ERROR_CORRECT_M,
+    "Q": qrcode.constants.ERROR_CORRECT_Q,
+    "H": qrcode.constants.ERROR_CORRECT_H,
+}
+
+# Standart uslub (bot shu bilan chizadi)
+DEFAULT_STYLE = {
+    "error_correction": "H",
+    "box_size": 12,
+    "border": 3,
+    "front_color": (30, 58, 138),
+    "back_color": (255, 255, 255),
+    "caption": "📱 QR Code Generator Bot",
+    "format": "png",
+}
+
+# Kesh versiyasi — chizish algoritmi o'zgarsa oshiring
+RENDER_VERSION = 1
+
+memory_cache = LRUCache(max_bytes=QR_CACHE_MB * 1024 * 1024)
+disk_cache = DiskCache(CACHE_DIR / "qr", suffix=".bin")
+register_cache("qr_memory", memory_cache)
+
+# source: memory | disk | render | uncached (ommaviy)
+qr_seconds = histogram("qr_generate_seconds", "QR kod olish vaqti (manba bo'yicha)", ("source",))
+
+
+def resolve_style(**style) -> dict:
+    """Standart uslubni berilgan parametrlar bilan to'ldirish"""
+    unknown = set(style) - set(DEFAULT_STYLE)
+    if unknown:
+        raise TypeError(f"Noma'lum uslub parametrlari: {', '.join(sorted(unknown))}")
+    resolved = {**DEFAULT_STYLE, **style}
+    if resolved["error_correction"] not in ERROR_LEVELS:
+        raise ValueError(f"Noto'g'ri error_correction: {resolved['error_correction']}")
+    if resolved["format"] not in WRITERS:
+        raise ValueError(f"Noto'g'ri format: {resolved['format']}")
+    resolved["front_color"] = tuple(resolved["front_color"])
+    resolved["back_color"] = tuple(resolved["back_color"])
+    return resolved
+
+
+def qr_cache_key(data: str, style: dict) -> str:
+    """Kesh kaliti: payload + uslub parametrlari hash'i"""
+    h = hashlib.sha256()
+    h.update(f"v{RENDER_VERSION}\0".encode())
+    for name in sorted(style):
+        h.update(f"{name}={style[name]!r}\0".encode())
+    h.update(data.encode("utf-8"))
+    return h.hexdigest()
+
+
+def qr_key(data: str, **style) -> str:
+    """Payload + uslub uchun kesh kaliti (tashqi keshlar uchun)"""
+    return qr_cache_key(data, resolve_style(**style))
+
+
+def qr_side(data: str, **style) -> int:
+    """
+    Rasm tomoni (piksel, yozuvsiz) — chizmasdan: faqat versiya aniqlanadi
+    (mask tanlash yo'q). Sig'masa — DataOverflowError (ValueError).
+    """
+    style = resolve_style(**style)
+    qr = qrcode.QRCode(error_correction=ERROR_LEVELS[style["error_correction"]])
+    qr.add_data(data)
+    modules = qr.best_fit() * 4 + 17
+    return (modules + 2 * style["border"]) * style["box_size"]
+
+
+def render_qr_code(data: str, style: dict) -> bytes:
+    """QR kodni noldan chizish (keshsiz)"""
+    qr = qrcode.QRCode(
+        version=None,
+        error_correction=ERROR_LEVELS[style["error_correction"]],
+        box_size=style["box_size"],
+        border=style["border"],
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+
+    writer = WRITERS[style["format"]][0]
+    return writer(qr.get_matrix(), style)
+
+
+def _load_or_render(data: str, style: dict, key: str) -> tuple[bytes, str]:
+    """
+    Disk keshdan o'qish yoki chizib saqlash (worker ichida ham ishlaydi).
+    Manba ham qaytadi ("disk" / "render") — worker boshqa jarayonda bo'lsa ham
+    metrikalar asosiy jarayonda yoziladi.
+    """
+    image = disk_cache.get(key)
+    if image is not None:
+        return image, "disk"
+    image = render_qr_code(data, style)
+    disk_cache.set(key, image)
+    return image, "render"
+
+
+def generate_qr_code(data: str, **style) -> bytes:
+    """Chiroyli QR kod yaratish (keshdan yoki noldan)"""
+    style = resolve_style(**style)
+    key = qr_cache_key(data, style)
+
+    start = time.perf_counter()
+    image, source = memory_cache.get(key), "memory"
+    if image is None:
+        image, source = _load_or_render(data, style, key)
+        memory_cache.set(key, image)
+    qr_seconds.observe(time.perf_counter() - start, source=source)
+    return image
+
+
+async def warm_up():
+    """Har bir worker'da bir QR chizish: importlar, shrift va tile'lar birinchi so'rovdan oldin tayyor"""
+    style = resolve_style()
+    await asyncio.gather(*(pool.run(render_qr_code, f"warm-up {i}", style) for i in range(pool.workers)))
+
+
+async def render_qr(data: str, *, cache: bool = True, **style) -> bytes:
+    """generate_qr_code'ning async varianti — chizish worker pool'da"""
+    style = resolve_style(**style)
+    if not cache:
+        # Bir martalik ommaviy generatsiya keshni "yuvib" yubormasin
+        with timed(qr_seconds, span="qr_render", source="uncached"):
+            return await pool.run(render_qr_code, data, style)
+
+    key = qr_cache_key(data, style)
+
+    start = time.perf_counter()
+    image, source = memory_cache.get(key), "memory"
+    if image is None:
+        image, source = await pool.run(_load_or_render, data, style, key)
+        memory_cache.set(key, image)
+    qr_seconds.observe(time.perf_counter() - start, source=source)
+    return image
@@ -4,55 +4,393 @@ Bot bilan birga ishlaydi (bot.py dan import qilinadi)
 """
 
 import os
+import gzip
+import asyncio
+import time
+import hashlib
+import logging
+from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import NamedTuple
 
-from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi import FastAPI, Request, Query, HTTPException
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
-from database import get_page
+try:
+    import brotli
+except ImportError:  # brotli ixtiyoriy — bo'lmasa faqat gzip
+    brotli = None
+
+from cache import LRUCache
+from database import init_db, close_db, get_page, get_page_version, on_page_change, pool as db_pool
+from media import MEDIA_DIR, is_immutable
+from images import image_srcset
+from audio import load_peaks
+from qrgen import render_qr, qr_key, qr_side, ERROR_LEVELS, QR_MAX_SIDE
+from qr_writers import WRITERS
+from qr_batch import BatchError, MAX_PAYLOAD, parse_csv, parse_json, normalize_items, check_side, iter_qr_zip
+from workers import pool
+from analytics import views
+from startup import phase, warm_phase, warm_up, mark_ready, is_ready, timings
+from metrics import (
+    counter, histogram, register_cache, timed, render_metrics,
+    should_trace, start_trace, current_spans, finish_trace, server_timing,
+)
 
 # ─── Yo'llar ────────────────────────────────────────────────
 BASE_DIR = Path(__file__).parent
-MEDIA_DIR = BASE_DIR / "media"
 TEMPLATES_DIR = BASE_DIR / "templates"
-
-# Papkalar yaratish
-MEDIA_DIR.mkdir(exist_ok=True)
+PAGE_CACHE_MB = int(os.getenv("PAGE_CACHE_MB", "16"))
+# Har bir kesh miss'da siqiladi: 11 — ~35 ms/sahifa, 5 — <1 ms (~10% kattaroq)
+BROTLI_QUALITY = 5
 
 # ─── FastAPI ─────────────────────────────────────────────────
-app = FastAPI(title="QR Code Landing Pages")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Alohida web jarayon (web.py / uvicorn server:app) bazani o'zi ochadi, warm-up
+    qiladi va yopadi. bot.py ichida ishlaganda bularni bot boshqaradi.
+    """
+    standalone = not db_pool.is_open
+    if standalone:
+        with phase("db"):
+            await init_db()
+        await warm_up()
+        with warm_phase("templates"):
+            warm_templates()
+        mark_ready()
+    views.start()
+    yield
+    await views.stop()
+    if standalone:
+        await pool.shutdown()
+        await close_db()
+
+
+app = FastAPI(title="QR Code Landing Pages", lifespan=lifespan)
+logger = logging.getLogger(__name__)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+http_seconds = histogram("http_request_seconds", "HTTP so'rovlar vaqti", ("route", "method", "status"))
+page_render_seconds = histogram("page_render_seconds", "Landing sahifa render (DB + shablon + siqish)")
+page_cache_total = counter("page_cache_total", "Landing sahifa keshi natijasi", ("result",))
+
+
+class MetricsMiddleware:
+    """
+    Har bir so'rov vaqti (route shabloni bo'yicha — past kardinallik) va
+    ixtiyoriy tracing: span'lar Server-Timing sarlavhasiga qo'shiladi
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        status = 500
+        headers = dict(scope["headers"])
+        trace = start_trace() if should_trace(headers.get(b"x-trace", b"").decode()) else None
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if trace is not None:
+                    spans = [("total", time.perf_counter() - start), *current_spans()]
+                    message["headers"] = [*message.get("headers", []), (b"server-timing", server_timing(spans).encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            route = getattr(scope.get("route"), "path", None)
+            if route is None:
+                route = "/media" if scope["path"].startswith("/media/") else "other"
+            http_seconds.observe(elapsed, route=route, method=scope["method"], status=status)
+            if trace is not None:
+                spans = finish_trace(trace)
+                logger.info(
+                    f"🔎 {scope['method']} {scope['path']} {status} {elapsed * 1000:.1f} ms | "
+                    + ", ".join(f"{name} {seconds * 1000:.1f}" for name, seconds in spans)
+                )
+
+
+app.add_middleware(MetricsMiddleware)
 templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
 
-# Statik fayllar (media)
-app.mount("/media", StaticFiles(directory=str(MEDIA_DIR)), name="media")
 
+def warm_templates():
+    """Shablonni oldindan kompilyatsiya qilish (Jinja uni keshlaydi)"""
+    templates.get_template("page.html")
 
-# ─── Landing sahifa ─────────────────────────────────────────
-@app.get("/page/{page_id}", response_class=HTMLResponse)
-async def landing_page(request: Request, page_id: str):
-    """Sahifani ko'rsatish"""
-    page = await get_page(page_id)
-    
+
+class MediaFiles(StaticFiles):
+    """Media fayllar: Range so'rovlari + uzoq muddatli kesh sarlavhalari"""
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        if is_immutable(os.path.basename(full_path)):
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        else:
+            # Eski (hash'siz) nomlar o'zgarishi mumkin — har safar tekshirilsin
+            response.headers["Cache-Control"] = "public, no-cache"
+        return response
+
+
+# Statik fayllar (media). FileResponse Range so'rovlarini o'zi qo'llaydi,
+# server "http.response.pathsend" kengaytmasini bersa — fayl nusxalanmasdan yuboriladi
+app.mount("/media", MediaFiles(directory=str(MEDIA_DIR)), name="media")
+
+
+# ─── Tayyor sahifalar keshi ─────────────────────────────────
+class RenderedPage(NamedTuple):
+    """Render qilingan HTML va uning siqilgan variantlari"""
+    version: int | None
+    etag: str
+    html: bytes
+    gzip: bytes
+    br: bytes | None
+
+    @property
+    def size(self) -> int:
+        return len(self.html) + len(self.gzip) + len(self.br or b"")
+
+
+page_cache = LRUCache(max_bytes=PAGE_CACHE_MB * 1024 * 1024, sizeof=lambda p: p.size)
+register_cache("page", page_cache)
+# Har bir sahifa uchun o'zgarishlar hisoblagichi — render paytida sahifa
+# o'zgarsa, eskirgan natija keshga yozilmaydi
+_page_generations: dict[str, int] = {}
+_rendering: dict[str, asyncio.Future] = {}
+
+
+@on_page_change
+def invalidate_page(page_id: str):
+    """Sahifa o'zgarganda keshdan o'chirish"""
+    _page_generations[page_id] = _page_generations.get(page_id, 0) + 1
+    page_cache.pop(page_id)
+
+
+def build_page_context(page_id: str, page: dict, waveform: dict | None = None) -> dict:
+    """page.html uchun kontekst"""
     # Agar sahifa topilmasa, bo'sh dict qaytadi
     has_content = bool(page.get("audio") or page.get("image") or page.get("text"))
 
-    # Media URL'lar
-    audio_url = f"/media/{page['audio']}" if page.get("audio") else None
+    # Media URL'lar (ixcham AAC nusxa tayyor bo'lsa — o'sha)
+    audio = page.get("audio_stream") or page.get("audio")
+    audio_url = f"/media/{audio}" if audio else None
     image_url = f"/media/{page['image']}" if page.get("image") else None
     text = page.get("text", "")
     title = page.get("title", "QR Page")
 
-    return templates.TemplateResponse("page.html", {
-        "request": request,
+    return {
         "page_id": page_id,
         "has_content": has_content,
         "audio_url": audio_url,
         "image_url": image_url,
+        "image_srcset": image_srcset(page),
+        "image_placeholder": page.get("image_placeholder"),
+        "waveform": waveform,
         "text": text,
         "title": title,
-    })
+    }
+
+
+def compress_page(html: str, version: int | None) -> RenderedPage:
+    """HTML'ni gzip va brotli bilan siqish (thread'da chaqiriladi)"""
+    raw = html.encode("utf-8")
+    etag = hashlib.sha256(raw).hexdigest()[:32]
+    return RenderedPage(
+        version=version,
+        etag=etag,
+        html=raw,
+        gzip=gzip.compress(raw, compresslevel=9, mtime=0),
+        br=brotli.compress(raw, quality=BROTLI_QUALITY) if brotli else None,
+    )
+
+
+async def render_page(page_id: str, version: int | None = None) -> RenderedPage:
+    """
+    Sahifani render qilish (bir vaqtdagi so'rovlar bitta render'ni kutadi).
+    version — bazadagi joriy versiya: qator keshi eskirgan bo'lsa qayta o'qiladi.
+    """
+    pending = _rendering.get(page_id)
+    if pending is not None:
+        return await asyncio.shield(pending)
+
+    future = asyncio.get_running_loop().create_future()
+    _rendering[page_id] = future
+    try:
+        generation = _page_generations.get(page_id, 0)
+        with timed(page_render_seconds, span="page_render"):
+            page = await get_page(page_id, version)
+            waveform = await asyncio.to_thread(load_peaks, page.get("audio_peaks"))
+            html = templates.get_template("page.html").render(build_page_context(page_id, page, waveform))
+            rendered = await asyncio.to_thread(compress_page, html, page.get("version"))
+        if _page_generations.get(page_id, 0) == generation:
+            page_cache.set(page_id, rendered)
+        future.set_result(rendered)
+        return rendered
+    except BaseException as e:
+        future.set_exception(e)
+        future.exception()  # kutuvchi bo'lmasa ham "never retrieved" ogohlantirmasin
+        raise
+    finally:
+        del _rendering[page_id]
+
+
+def pick_encoding(request: Request) -> str:
+    """Accept-Encoding bo'yicha eng yaxshi variant"""
+    accepted = {
+        part.split(";")[0].strip().lower()
+        for part in request.headers.get("accept-encoding", "").split(",")
+    }
+    if brotli and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return "identity"
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match tekshiruvi (weak taqqoslash)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return etag in tags
+
+
+# ─── Landing sahifa ─────────────────────────────────────────
+@app.get("/page/{page_id}", response_class=HTMLResponse)
+async def landing_page(request: Request, page_id: str):
+    """Sahifani ko'rsatish"""
+    # Sahifani boshqa jarayon (bot) o'zgartirgan bo'lishi mumkin — versiya
+    # bazadan tekshiriladi (PK bo'yicha bitta ustun, juda arzon)
+    version = await get_page_version(page_id)
+    rendered = page_cache.get(page_id)
+    if rendered is None or rendered.version != version:
+        page_cache_total.inc(result="miss" if rendered is None else "stale")
+        rendered = await render_page(page_id, version)
+    else:
+        page_cache_total.inc(result="hit")
+    if version is not None:
+        # Faqat xotirada — bazaga fonda, partiyalab yoziladi (analytics.py)
+        views.record(page_id, request.headers.get("referer"), request.headers.get("user-agent"))
+
+    encoding = pick_encoding(request)
+    # Har bir kodlash — alohida representation, shuning uchun ETag ham alohida
+    etag = f'"{rendered.etag}-{encoding}"'
+    headers = {
+        "ETag": etag,
+        "Vary": "Accept-Encoding",
+        "Cache-Control": "no-cache",
+    }
+
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    if encoding == "br":
+        body = rendered.br
+    elif encoding == "gzip":
+        body = rendered.gzip
+    else:
+        body = rendered.html
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+
+    return HTMLResponse(content=body, headers=headers)
+
+
+# ─── QR API ─────────────────────────────────────────────────
+def qr_style(format: str, size: int, ec: str) -> dict:
+    if format not in WRITERS:
+        raise HTTPException(status_code=400, detail=f"format: {', '.join(WRITERS)}")
+    ec = ec.upper()
+    if ec not in ERROR_LEVELS:
+        raise HTTPException(status_code=400, detail="ec: L, M, Q yoki H")
+    return {"format": format, "box_size": size, "error_correction": ec}
+
+
+@app.get("/qr")
+async def qr_image(
+    request: Request,
+    data: str = Query(..., min_length=1, max_length=MAX_PAYLOAD),
+    format: str = Query("png"),
+    size: int = Query(12, ge=1, le=40),
+    ec: str = Query("H"),
+):
+    """Bitta QR kod (natija payload + parametrlardan to'liq aniqlanadi)"""
+    style = qr_style(format, size, ec)
+
+    # Kontent faqat parametrlarga bog'liq — abadiy keshlash mumkin
+    etag = f'"{qr_key(data, **style)[:32]}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    try:
+        side = qr_side(data, **style)
+        if side > QR_MAX_SIDE:
+            raise HTTPException(status_code=400, detail=f"Rasm {side} px — ko'pi bilan {QR_MAX_SIDE} px (size'ni kamaytiring)")
+        # Ommaviy so'rovlar bot keshlarini (xotira/disk) to'ldirmasin — brauzer/CDN ETag bilan keshlaydi
+        image = await render_qr(data, cache=False, **style)
+    except ValueError as e:  # qrcode.exceptions.DataOverflowError ham ValueError
+        raise HTTPException(status_code=400, detail=str(e))
+    return Response(content=image, media_type=WRITERS[format][1], headers=headers)
+
+
+@app.post("/qr/batch")
+async def qr_batch(
+    request: Request,
+    format: str = Query("png"),
+    size: int = Query(12, ge=1, le=40),
+    ec: str = Query("H"),
+):
+    """
+    Ko'p QR kod → ZIP (oqim). Body:
+    - JSON: ["payload", ...] yoki [{"data": "...", "name": "..."}, ...]
+    - CSV (text/csv): payload[,fayl_nomi]
+    """
+    style = qr_style(format, size, ec)
+    content_type = request.headers.get("content-type", "")
+    try:
+        if "csv" in content_type or content_type.startswith("text/plain"):
+            raw = parse_csv((await request.body()).decode("utf-8-sig"))
+        else:
+            raw = parse_json(await request.json())
+        items = normalize_items(raw, ext=WRITERS[format][2])
+        check_side(items, **style)
+    except (BatchError, ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return StreamingResponse(
+        iter_qr_zip(items, **style),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="qrcodes.zip"'},
+    )
+
+
+# ─── Metrikalar ─────────────────────────────────────────────
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    """Prometheus text format (METRICS_TOKEN bo'lsa — Bearer bilan)"""
+    if METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401)
+    return Response(content=render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+# Faqat bot jarayoni uchun (SERVE_WEB=0, METRICS_PORT) — landing sahifalarsiz
+metrics_app = FastAPI(title="Metrics")
+metrics_app.add_api_route("/metrics", metrics, include_in_schema=False)
 
 
 # ─── Health check ────────────────────────────────────────────
@@ -63,4 +401,7 @@ async def root():
 
 @app.get("/health")
 async def health():
-    return {"status": "healthy"}
+    """Readiness: warm-up tugaguncha 503"""
+    if not is_ready():
+        return JSONResponse({"status": "starting", "startup": timings}, status_code=503)
+    return {"status": "healthy", "startup": timings}
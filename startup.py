@@ -0,0 +1,78 @@
+"""
+🚀 Ishga tushish: bosqichlar vaqti, warm-up va tayyorlik (readiness) holati
+/health tayyor bo'lmaguncha 503 qaytaradi — platforma trafikni hali yubormaydi.
+Bu modul yengil: og'ir modullar faqat warm_up() ichida import qilinadi.
+"""
+
+import os
+import time
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+STARTED = time.perf_counter()
+# bosqich → soniya
+timings: dict[str, float] = {}
+_checkpoint = STARTED
+_ready = False
+
+
+def checkpoint(name: str):
+    """Oldingi checkpoint'dan beri o'tgan vaqtni bosqich sifatida yozish (masalan, importlar)"""
+    global _checkpoint
+    now = time.perf_counter()
+    _record(name, now - _checkpoint)
+    _checkpoint = now
+
+
+@contextmanager
+def phase(name: str):
+    """Blok vaqtini bosqich sifatida yozish"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(name, time.perf_counter() - start)
+
+
+@contextmanager
+def warm_phase(name: str):
+    """
+    Warm-up bosqichi: xato ishga tushishni to'xtatmaydi (logga yoziladi) —
+    kesh sovuq qoladi, lekin servis baribir tayyor bo'ladi
+    """
+    with phase(name):
+        try:
+            yield
+        except Exception as e:
+            logger.warning(f"⚠️ Warm-up {name} xato (o'tkazib yuborildi): {e}")
+
+
+def _record(name: str, seconds: float):
+    timings[name] = round(seconds, 4)
+    logger.info(f"⏱ {name}: {seconds * 1000:.0f} ms")
+
+
+async def warm_up():
+    """Birinchi so'rov sovuq bo'lmasin: sahifa qatorlari keshi va QR worker'lar"""
+    from database import prime_page_cache
+    from qrgen import warm_up as warm_qr
+
+    # bot.py bu modulni load_dotenv() dan oldin import qiladi — .env shu yerda o'qiladi
+    warmup_pages = int(os.getenv("WARMUP_PAGES", "200"))
+    with warm_phase("warm_db"):
+        await prime_page_cache(warmup_pages)
+    with warm_phase("warm_qr"):
+        await warm_qr()
+
+
+def mark_ready():
+    global _ready
+    _ready = True
+    timings["total"] = round(time.perf_counter() - STARTED, 4)
+    logger.info(f"✅ Tayyor: ishga tushish {timings['total']:.2f} s")
+
+
+def is_ready() -> bool:
+    return _ready
@@ -0,0 +1,62 @@
+"""
+🧪 Migratsiyalar: yangi bazada sxema yaratiladi va asosiy so'rovlar indeks ishlatadi
+
+Ishga tushirish:
+    python -m pytest -q tests
+"""
+
+import sys
+import asyncio
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import database  # noqa: E402
+
+# So'rov → uni ishlatuvchi funksiya (database.py dagi SQL bilan bir xil)
+QUERY_PLANS = {
+    "get_user_page": ("SELECT * FROM pages WHERE user_id = ? ORDER BY created_at DESC LIMIT 1", (1,)),
+    "get_page": ("SELECT * FROM pages WHERE id = ?", ("p",)),
+    "qr_files_cleanup": ("DELETE FROM qr_files WHERE page_url = ? AND cache_key != ?", ("u", "k")),
+}
+
+
+@pytest.fixture(scope="module")
+def migrated_db(tmp_path_factory) -> Path:
+    path = tmp_path_factory.mktemp("db") / "test.db"
+    original = database.pool
+
+    async def run():
+        database.pool = database.ConnectionPool(path, 2)
+        try:
+            await database.init_db()
+        finally:
+            await database.close_db()
+
+    try:
+        asyncio.run(run())
+    finally:
+        database.pool = original
+    return path
+
+
+def test_schema_version(migrated_db):
+    con = sqlite3.connect(migrated_db)
+    try:
+        assert con.execute("PRAGMA user_version").fetchone()[0] == len(database.MIGRATIONS)
+    finally:
+        con.close()
+
+
+@pytest.mark.parametrize("name", QUERY_PLANS)
+def test_query_uses_index(migrated_db, name):
+    sql, params = QUERY_PLANS[name]
+    con = sqlite3.connect(migrated_db)
+    try:
+        plan = " | ".join(row[3] for row in con.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+    finally:
+        con.close()
+    assert "USING" in plan and "INDEX" in plan, f"{name}: {plan}"
@@ -0,0 +1,27 @@
+"""
+🌐 Web jarayonlar — faqat landing sahifalar va QR API (botsiz)
+Bir nechta uvicorn worker: sahifa trafigi bot trafigidan alohida, barcha
+yadrolarda. Bot esa alohida ishga tushiriladi: SERVE_WEB=0 python bot.py
+"""
+
+import os
+import logging
+
+from dotenv import load_dotenv
+load_dotenv()
+
+import uvicorn
+
+PORT = int(os.getenv("PORT", "8000"))
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", "0")) or (os.cpu_count() or 1)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s | %(levelname)s | %(message)s"
+)
+
+
+if __name__ == "__main__":
+    logging.getLogger(__name__).info(f"🌐 Web server: port {PORT}, {WEB_WORKERS} worker")
+    # Har bir worker — alohida jarayon; baza ulanishlarini server.lifespan ochadi
+    uvicorn.run("server:app", host="0.0.0.0", port=PORT, workers=WEB_WORKERS, log_level="info")
@@ -0,0 +1,122 @@
+"""
+📨 Webhook rejimi — Telegram update'lari FastAPI ilovasi orqali keladi
+So'rov darhol 200 bilan tasdiqlanadi, update esa cheklangan navbatga qo'yiladi
+va bir nechta ishchi (worker) uni dp.feed_raw_update orqali qayta ishlaydi.
+Long polling BOT_MODE=polling bilan saqlanib qolgan.
+"""
+
+import os
+import hmac
+import asyncio
+import hashlib
+import logging
+from typing import TYPE_CHECKING
+
+from aiogram import Bot, Dispatcher
+
+if TYPE_CHECKING:
+    from fastapi import FastAPI
+
+logger = logging.getLogger(__name__)
+
+# ─── Sozlamalar ─────────────────────────────────────────────
+BOT_MODE = os.getenv("BOT_MODE", "polling")  # polling | webhook
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "8"))
+WEBHOOK_QUEUE = int(os.getenv("WEBHOOK_QUEUE", "1000"))
+# To'xtashda navbatdagi update'larni tugatish uchun vaqt (soniya)
+WEBHOOK_DRAIN_TIMEOUT = 10
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+def webhook_secret(token: str) -> str:
+    """Maxfiy kalit: .env dagisi yoki token'dan barqaror hosil qilingan"""
+    # Telegram faqat A-Z, a-z, 0-9, _ va - belgilarini qabul qiladi
+    return WEBHOOK_SECRET or hashlib.sha256(f"webhook:{token}".encode()).hexdigest()
+
+
+class UpdateQueue:
+    """Cheklangan navbat + ishchilar: webhook javobi handler'larni kutmaydi"""
+
+    def __init__(self, dp: Dispatcher, bot: Bot, workers: int, max_size: int):
+        self.dp = dp
+        self.bot = bot
+        self.workers = workers
+        self.max_size = max_size
+        self._queue: asyncio.Queue | None = None
+        self._tasks: list[asyncio.Task] = []
+
+    def start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"update-worker-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info(f"📨 Update navbati: {self.workers} ishchi, sig'im {self.max_size}")
+
+    def put(self, update: dict) -> bool:
+        """Update'ni navbatga qo'yish; navbat to'lgan bo'lsa — False"""
+        try:
+            self._queue.put_nowait(update)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    @property
+    def size(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    async def _worker(self):
+        while True:
+            update = await self._queue.get()
+            try:
+                await self.dp.feed_raw_update(self.bot, update)
+            except Exception as e:
+                logger.error(f"❌ Update {update.get('update_id')} xato: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def stop(self):
+        """Navbatdagilarni tugatishga vaqt berib, ishchilarni to'xtatish"""
+        if self._queue is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=WEBHOOK_DRAIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ {self._queue.qsize()} ta update qayta ishlanmay qoldi")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+def setup_webhook(app: "FastAPI", dp: Dispatcher, bot: Bot, secret: str) -> UpdateQueue:
+    """server.app ga webhook endpoint'ini qo'shish"""
+    # Polling rejimida FastAPI umuman yuklanmasin (ishga tushish tezroq)
+    from fastapi import Request, HTTPException
+    from fastapi.responses import Response
+
+    updates = UpdateQueue(dp, bot, WEBHOOK_WORKERS, WEBHOOK_QUEUE)
+    expected = secret.encode()
+
+    @app.post(WEBHOOK_PATH, include_in_schema=False)
+    async def telegram_webhook(request: Request):
+        received = request.headers.get(SECRET_HEADER, "").encode()
+        if not hmac.compare_digest(received, expected):
+            raise HTTPException(status_code=401)
+        try:
+            update = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="JSON emas")
+        if not isinstance(update, dict):
+            raise HTTPException(status_code=400, detail="JSON emas")
+
+        if not updates.put(update):
+            # Telegram 2xx bo'lmagan javobda update'ni keyinroq qayta yuboradi
+            logger.warning("⚠️ Update navbati to'lgan — 503")
+            return Response(status_code=503, headers={"Retry-After": "1"})
+        return Response(status_code=200)
+
+    return updates
@@ -0,0 +1,93 @@
+"""
+⚙️ Og'ir (CPU) ishlar uchun worker pool
+Event loop'ni bloklamaslik uchun rasm chizish va h.k. shu yerda bajariladi
+"""
+
+import os
+import asyncio
+import logging
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# ─── Sozlamalar ─────────────────────────────────────────────
+WORKER_BACKEND = os.getenv("WORKER_BACKEND", "process")  # process | thread | inline
+WORKER_COUNT = int(os.getenv("WORKER_COUNT", "0")) or (os.cpu_count() or 1)
+WORKER_QUEUE = int(os.getenv("WORKER_QUEUE", "64"))
+WORKER_TIMEOUT = float(os.getenv("WORKER_TIMEOUT", "30"))
+
+
+class PoolBusy(RuntimeError):
+    """Navbat to'lgan — yangi ish qabul qilinmaydi"""
+
+
+class WorkerPool:
+    """Cheklangan navbatli worker pool (backpressure + timeout)"""
+
+    def __init__(self, backend: str, workers: int, max_pending: int, timeout: float):
+        if backend not in ("process", "thread", "inline"):
+            raise ValueError(f"Noma'lum WORKER_BACKEND: {backend}")
+        self.backend = backend
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._executor: Executor | None = None
+        self._slots: asyncio.Semaphore | None = None
+        self._closed = False
+
+    def _get_executor(self) -> Executor | None:
+        if self._closed:
+            raise RuntimeError("Worker pool yopilgan")
+        if self._executor is None and self.backend != "inline":
+            if self.backend == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="worker")
+            logger.info(f"⚙️ Worker pool: {self.backend} x{self.workers}, navbat {self.max_pending}")
+        return self._executor
+
+    async def run(self, fn, *args, timeout: float | None = None):
+        """Funksiyani pool'da bajarish va natijani kutish"""
+        timeout = timeout or self.timeout
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+
+        # Backpressure: navbatda joy bo'lguncha kutamiz, lekin cheksiz emas
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=timeout)
+        except asyncio.TimeoutError:
+            raise PoolBusy("Worker navbati to'lgan") from None
+
+        try:
+            executor = self._get_executor()
+            if executor is None:
+                return fn(*args)
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(executor, fn, *args)
+            return await asyncio.wait_for(future, timeout=timeout)
+        finally:
+            self._slots.release()
+
+    async def shutdown(self):
+        """Ishlayotgan vazifalarni tugatib, pool'ni yopish"""
+        self._closed = True
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            await asyncio.get_running_loop().run_in_executor(
+                None, lambda: executor.shutdown(wait=True, cancel_futures=True)
+            )
+            logger.info("⚙️ Worker pool yopildi")
+
+
+pool = WorkerPool(WORKER_BACKEND, WORKER_COUNT, WORKER_QUEUE, WORKER_TIMEOUT)
+
+# Fon vazifalari (GC ularni yo'q qilmasligi uchun havola saqlanadi)
+_background: set[asyncio.Task] = set()
+
+
+def spawn(coro) -> asyncio.Task:
+    """Coroutine'ni fonda ishga tushirish (natijasini kutmasdan)"""
+    task = asyncio.create_task(coro)
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+    return task